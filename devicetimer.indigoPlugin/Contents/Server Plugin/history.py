@@ -0,0 +1,216 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+####################
+# Device Timer plugin: persistent transition history stores
+import os
+import sqlite3
+import struct
+import threading
+from bisect import bisect_left
+from os import path
+from typing import Dict, List, Tuple
+
+# Errors a history store can raise; the plugin logs them and carries on in memory
+HISTORY_ERRORS: Tuple[type, ...] = (OSError, sqlite3.Error, struct.error)
+# Journal records: timer id (uint32), epoch seconds (double), kind (uint8)
+JOURNAL_RECORD = struct.Struct("<IdB")
+# Journal-only kind marking when a timer's history began
+JOURNAL_SINCE: int = 255
+
+
+class HistoryStore:
+    """
+    SQLite log of every timer's transitions, so interval history survives restarts.
+
+    Writes are buffered and inserted in one transaction per flush. Each timer also
+    records when its history began, which tells a restart how much of a window the
+    stored transitions actually cover.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._buffer: List[Tuple[int, float, int]] = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transitions (timer_id INTEGER NOT NULL, ts REAL NOT NULL, kind INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS transitions_timer_ts ON transitions (timer_id, ts)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS timers (timer_id INTEGER PRIMARY KEY, since REAL NOT NULL)")
+
+    def record(self, timer_id: int, ts: float, kind: int) -> None:
+        with self._lock:
+            self._buffer.append((timer_id, ts, kind))
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            with self._conn:
+                self._conn.executemany("INSERT INTO transitions (timer_id, ts, kind) VALUES (?, ?, ?)", rows)
+
+    def load(self, timer_id: int, horizon_ts: float, now_ts: float) -> Tuple[float, List[Tuple[float, int]]]:
+        """
+        (history start, transitions) for a timer. Transitions run from the last one
+        before horizon_ts (in case an interval straddles it) to the newest. A timer
+        without history starts it at now_ts.
+        """
+        self.flush()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR IGNORE INTO timers (timer_id, since) VALUES (?, ?)", (timer_id, now_ts))
+            since = self._conn.execute("SELECT since FROM timers WHERE timer_id = ?", (timer_id,)).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT ts, kind FROM transitions WHERE timer_id = ? AND ts >= "
+                "(SELECT COALESCE(MAX(ts), 0) FROM transitions WHERE timer_id = ? AND ts < ?) ORDER BY ts, rowid",
+                (timer_id, timer_id, horizon_ts),
+            ).fetchall()
+        return since, rows
+
+    def prune(self, timer_id: int, horizon_ts: float) -> None:
+        """Delete transitions older than horizon_ts, keeping the last one before it."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM transitions WHERE timer_id = ? AND ts < "
+                    "(SELECT COALESCE(MAX(ts), 0) FROM transitions WHERE timer_id = ? AND ts < ?)",
+                    (timer_id, timer_id, horizon_ts),
+                )
+
+    def forget(self, timer_id: int) -> None:
+        with self._lock:
+            self._buffer = [row for row in self._buffer if row[0] != timer_id]
+            with self._conn:
+                self._conn.execute("DELETE FROM transitions WHERE timer_id = ?", (timer_id,))
+                self._conn.execute("DELETE FROM timers WHERE timer_id = ?", (timer_id,))
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class JournalStore:
+    """
+    Append-only binary journal of transitions: the same interface as HistoryStore
+    without a database.
+
+    Records are fixed-size JOURNAL_RECORD structs appended sequentially. The whole
+    journal is read once when opened and kept as a per-timer index, so startup
+    loads are in-memory slices. Pruning only trims the index; a background
+    compactor thread then rewrites the file without the dropped records and
+    atomically swaps it in.
+    """
+
+    def __init__(self, journal_path: str) -> None:
+        self.journal_path = journal_path
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._transitions: Dict[int, List[Tuple[float, int]]] = {}
+        self._since: Dict[int, float] = {}
+        self._read_journal()
+        self._file = open(journal_path, "ab")
+        self._compact_wanted = threading.Event()
+        self._stopping = False
+        self._compactor = threading.Thread(target=self._compactor_loop, name="DeviceTimerJournalCompactor", daemon=True)
+        self._compactor.start()
+
+    def _read_journal(self) -> None:
+        if not path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as fh:
+            data = fh.read()
+        # A torn final record (crash mid-append) is cut off, so appends stay aligned
+        usable = len(data) - len(data) % JOURNAL_RECORD.size
+        if usable < len(data):
+            with open(self.journal_path, "r+b") as fh:
+                fh.truncate(usable)
+        for timer_id, ts, kind in JOURNAL_RECORD.iter_unpack(data[:usable]):
+            if kind == JOURNAL_SINCE:
+                self._since.setdefault(timer_id, ts)
+            else:
+                self._transitions.setdefault(timer_id, []).append((ts, kind))
+
+    def record(self, timer_id: int, ts: float, kind: int) -> None:
+        with self._lock:
+            self._buffer += JOURNAL_RECORD.pack(timer_id, ts, kind)
+            if kind != JOURNAL_SINCE:
+                self._transitions.setdefault(timer_id, []).append((ts, kind))
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._buffer:
+                self._file.write(self._buffer)
+                self._file.flush()
+                self._buffer = bytearray()
+
+    def load(self, timer_id: int, horizon_ts: float, now_ts: float) -> Tuple[float, List[Tuple[float, int]]]:
+        """As HistoryStore.load, served from the in-memory index."""
+        with self._lock:
+            if timer_id not in self._since:
+                self._since[timer_id] = now_ts
+                self._buffer += JOURNAL_RECORD.pack(timer_id, now_ts, JOURNAL_SINCE)
+            transitions = self._transitions.get(timer_id, [])
+            first = max(0, bisect_left(transitions, (horizon_ts,)) - 1)
+            return self._since[timer_id], transitions[first:]
+
+    def prune(self, timer_id: int, horizon_ts: float) -> None:
+        """Drop transitions older than horizon_ts (keeping the last one before it) and schedule a rewrite."""
+        with self._lock:
+            transitions = self._transitions.get(timer_id)
+            if not transitions:
+                return
+            first = max(0, bisect_left(transitions, (horizon_ts,)) - 1)
+            if first:
+                del transitions[:first]
+                self._compact_wanted.set()
+
+    def forget(self, timer_id: int) -> None:
+        with self._lock:
+            self._transitions.pop(timer_id, None)
+            self._since.pop(timer_id, None)
+            self._compact_wanted.set()
+
+    def _compactor_loop(self) -> None:
+        while True:
+            self._compact_wanted.wait()
+            self._compact_wanted.clear()
+            if self._stopping:
+                return
+            try:
+                self.compact()
+            except Exception:
+                # Left as is (the thread carries on); the next prune asks for another rewrite
+                pass
+
+    def compact(self) -> None:
+        """Rewrite the journal from the index into a temp file and swap it in atomically."""
+        with self._lock:
+            data = bytearray()
+            for timer_id, since in self._since.items():
+                data += JOURNAL_RECORD.pack(timer_id, since, JOURNAL_SINCE)
+            for timer_id, transitions in self._transitions.items():
+                for ts, kind in transitions:
+                    data += JOURNAL_RECORD.pack(timer_id, ts, kind)
+            tmp_path = self.journal_path + ".tmp"
+            with open(tmp_path, "wb") as fh:
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.journal_path)
+            self._file = open(self.journal_path, "ab")
+            # Buffered records are already in the index, so they are in the rewrite
+            self._buffer = bytearray()
+
+    def close(self) -> None:
+        self._stopping = True
+        self._compact_wanted.set()
+        self._compactor.join(timeout=5.0)
+        self.flush()
+        with self._lock:
+            self._file.close()
+
@@ -7,15 +7,32 @@ try:
 except ImportError:
     pass
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 import os
 import sys
 import platform
 import traceback
 import logging
 import logging.handlers
+import heapq
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
 from os import path
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Set
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Set, Union
+
+from history import HISTORY_ERRORS, HistoryStore, JournalStore
+from sql_logger import read_state_changes
+from tracker import OPEN_END, TRANSITION_OFF, TRANSITION_ON, TRANSITION_OPEN, WINDOWS, Tracker, count_state_id
 
 ################################################################################
 # Indigo Event Log handler that routes Python logging to Indigo's Event Log
@@ -57,21 +74,160 @@ class IndigoLogHandler(logging.Handler):
         except Exception as ex:
             indigo.server.log(f"Error in Logging: {ex}", type=self.displayName, isError=True, level=logging.ERROR)
 
-# Rolling windows in seconds mapped to state ids
-WINDOWS: List[Tuple[str, int]] = [
-    ("timeon_24hours", 24 * 3600),
-    ("timeon_48hours", 48 * 3600),
-    ("timeon_72hours", 72 * 3600),
-    ("timeon_96hours", 96 * 3600),
-    ("timeon_5days", 5 * 24 * 3600),
-    ("timeon_6days", 6 * 24 * 3600),
-    ("timeon_1week", 7 * 24 * 3600),
-    ("timeon_2weeks", 14 * 24 * 3600),
-    ("timeon_3weeks", 21 * 24 * 3600),
-]
+DEFAULT_WINDOW_SPEC: str = "24h, 48h, 72h, 96h, 5d, 6d, 1w, 2w, 3w"
+
+# Window spec units: suffix -> (seconds, state id word)
+WINDOW_UNITS: Dict[str, Tuple[int, str]] = {
+    "m": (60, "minute"),
+    "h": (3600, "hour"),
+    "d": (24 * 3600, "day"),
+    "w": (7 * 24 * 3600, "week"),
+}
+WINDOW_STATE_RE = re.compile(r"^timeon_(\d+)(minute|hour|day|week)s?$")
 
 RETENTION_SECONDS: int = WINDOWS[-1][1]
+# Minimum spacing between scheduled refreshes of one timer
 REFRESH_INTERVAL_SECS: int = 15
+# Minute states are published to 1 decimal place, so a displayed value can move every 6 seconds
+DISPLAY_STEP_SECS: float = 6.0
+# How long the state writer waits after being woken so a burst of updates merges into one write
+STATE_WRITE_COALESCE_SECS: float = 0.25
+
+# Rolling window engines: "sweep" recomputes every window from the prefix index each
+# refresh; "incremental" keeps a running total per window and only advances cursors;
+# "numpy" evaluates every tracker at once with array operations (needs NumPy).
+WINDOW_ENGINES: Tuple[str, ...] = ("sweep", "incremental", "numpy")
+
+# Refresh scheduling: "burst" refreshes timers together as their deadlines fall due;
+# "staggered" pins each timer to its own hashed slot within REFRESH_INTERVAL_SECS
+REFRESH_MODES: Tuple[str, ...] = ("burst", "staggered")
+
+# Duration text styles: "long" ("3 hours and 12 mins"), "compact" ("3h 12m") and "hhmm" ("03:12")
+TEXT_FORMATS: Tuple[str, ...] = ("long", "compact", "hhmm")
+# Where transition history is persisted between restarts
+HISTORY_STORES: Tuple[str, ...] = ("none", "sqlite", "journal")
+# Checkpoint of every tracker, written atomically on shutdown and every N minutes
+CHECKPOINT_FILE: str = "checkpoint.json"
+CHECKPOINT_MINUTES_DEFAULT: int = 10
+# Indigo's SQL Logger: one device_history_<device id> table per device, with the
+# local timestamp in 'ts' and onState logged as 'onoffstate'
+SQL_LOGGER_DB: str = "indigo_history.sqlite"
+
+
+@lru_cache(maxsize=8192)
+def format_duration(minutes: int, style: str = "long") -> str:
+    """
+    Text for a whole number of minutes. The text only has minute resolution, so
+    each distinct (minutes, style) is rendered once and then served from the cache.
+    """
+    hours, mins = divmod(minutes, 60)
+    if style == "compact":
+        return f"{hours}h {mins}m" if hours > 0 else f"{mins}m"
+    if style == "hhmm":
+        return f"{hours:02d}:{mins:02d}"
+    parts = []
+    if hours > 0:
+        parts.append(f"{hours} hour" + ("s" if hours != 1 else ""))
+    if mins > 0 or hours == 0:
+        parts.append(f"{mins} min" + ("s" if mins != 1 else ""))
+    return " and ".join(parts)
+
+
+def parse_window_spec(spec: str) -> List[Tuple[str, int]]:
+    """
+    Parse a window list such as "1h, 6h, 24h, 30d" into (state_id, seconds) pairs,
+    sorted shortest first. Raises ValueError on an unrecognised entry.
+    """
+    windows: Dict[str, int] = {}
+    for token in re.split(r"[,\s]+", spec.strip()):
+        if not token:
+            continue
+        match = re.fullmatch(r"(\d+)([mhdw])", token.lower())
+        if not match or int(match.group(1)) <= 0:
+            raise ValueError(f"invalid window '{token}' (use e.g. 90m, 6h, 30d or 2w)")
+        amount = int(match.group(1))
+        unit_secs, word = WINDOW_UNITS[match.group(2)]
+        windows[f"timeon_{amount}{word}{'s' if amount != 1 else ''}"] = amount * unit_secs
+    if not windows:
+        raise ValueError("at least one window is required")
+    return sorted(windows.items(), key=lambda item: (item[1], item[0]))
+
+
+def window_labels(window_state_id: str) -> Tuple[str, str]:
+    """Long and short labels for a window state id, e.g. ("Last 24 Hours", "24h")."""
+    match = WINDOW_STATE_RE.match(window_state_id)
+    if not match:
+        return window_state_id, window_state_id
+    amount, word = match.group(1), match.group(2)
+    plural = "s" if amount != "1" else ""
+    return f"Last {amount} {word.capitalize()}{plural}", f"{amount}{word[0]}"
+
+
+def backfill_transitions(changes: List[Tuple[float, bool]]) -> List[Tuple[float, int]]:
+    """
+    Transitions for Tracker.replay from a device's logged ON/OFF changes. The first
+    change opens an interval without an ON event if it is ON, since the logger
+    cannot say when that ON period began; a leading OFF only sets the start state.
+    """
+    transitions: List[Tuple[float, int]] = []
+    for index, (ts, on) in enumerate(changes):
+        if index == 0:
+            if on:
+                transitions.append((ts, TRANSITION_OPEN))
+        else:
+            transitions.append((ts, TRANSITION_ON if on else TRANSITION_OFF))
+    return transitions
+
+
+def _batch_sweep_on_seconds(trackers: List[Tracker], boundaries: "np.ndarray", now_ts: float) -> "np.ndarray":
+    """
+    Vectorized Tracker.sweep_on_seconds for many trackers at once.
+
+    boundaries has one row per tracker. Every tracker's live interval columns and
+    prefix index are packed into contiguous arrays; each segment's ends are shifted
+    by segment * span so that one searchsorted over the packed ends answers every
+    (tracker, boundary) query. Returns ON seconds in [boundary, now] with the same
+    shape as boundaries.
+    """
+    count = len(trackers)
+    lo = float(boundaries.min()) - 1.0 if boundaries.size else now_ts - 1.0
+    span = now_ts - lo + 2.0
+
+    lengths = np.fromiter((t.interval_count for t in trackers), dtype=np.int64, count=count)
+    seg_off = np.zeros(count, dtype=np.int64)
+    if count > 1:
+        np.cumsum(lengths[:-1], out=seg_off[1:])
+    cum_off = seg_off + np.arange(count, dtype=np.int64)
+
+    # Slicing an array copies it, so the views below never pin the live columns
+    # (an exported buffer would make deviceUpdated's append/pop raise BufferError)
+    starts = np.concatenate([np.frombuffer(t.starts[t.head:], dtype=np.float64) for t in trackers] + [np.empty(0)])
+    ends = np.concatenate([np.frombuffer(t.ends[t.head:], dtype=np.float64) for t in trackers] + [np.empty(0)])
+    cum_on = np.concatenate([np.frombuffer(t.cum_on[t.head:], dtype=np.float64) for t in trackers])
+
+    seg = np.repeat(np.arange(count, dtype=np.float64), lengths)
+    # Open ends (OPEN_END) clip to now, which is after every boundary
+    keys = np.clip(ends, lo, now_ts) - lo + seg * span
+    query = boundaries - lo + np.arange(count, dtype=np.float64)[:, None] * span
+
+    first = np.searchsorted(keys, query.ravel(), side="right").reshape(boundaries.shape)
+    local = first - seg_off[:, None]
+    closed_total = cum_on[cum_off + lengths]
+    totals = closed_total[:, None] - cum_on[cum_off[:, None] + local]
+
+    # Head correction for a closed interval straddling the boundary
+    if ends.size:
+        safe = np.minimum(first, ends.size - 1)
+        first_start = starts[safe]
+        straddles = (local < lengths[:, None]) & (ends[safe] != OPEN_END) & (first_start < boundaries)
+        totals -= np.where(straddles, boundaries - first_start, 0.0)
+
+    # Tail correction for the open interval
+    is_open = np.fromiter((t.is_open for t in trackers), dtype=bool, count=count)
+    open_start = np.fromiter((t.starts[-1] if t.is_open else now_ts for t in trackers), dtype=np.float64, count=count)
+    tail = np.maximum(0.0, now_ts - np.maximum(open_start[:, None], boundaries))
+    totals += np.where(is_open[:, None], tail, 0.0)
+    return totals
 
 
 class Plugin(indigo.PluginBase):
@@ -138,6 +294,12 @@ class Plugin(indigo.PluginBase):
 
         # Convenience debug flag
         self.debug = bool(self.pluginPrefs.get("showDebugInfo", False))
+        self.windowEngine = self._validated_window_engine(self.pluginPrefs.get("windowEngine", "sweep"))
+        self.textFormat = self._validated_text_format(self.pluginPrefs.get("textFormat", "long"))
+        self.refreshMode = self._validated_refresh_mode(self.pluginPrefs.get("refreshMode", "burst"))
+        self.historyStore = self._validated_history_store(self.pluginPrefs.get("historyStore", "sqlite"))
+        self.checkpointMinutes = self._validated_checkpoint_minutes(self.pluginPrefs.get("checkpointMinutes", CHECKPOINT_MINUTES_DEFAULT))
+        self.sqlLoggerBackfill = bool(self.pluginPrefs.get("sqlLoggerBackfill", False))
 
         # Session header
         self.logger.info("")
@@ -152,13 +314,37 @@ class Plugin(indigo.PluginBase):
 
         # --- Plugin runtime state -------------------------------------------
         # Trackers keyed by this plugin's timer device ID
-        # tracker structure: {
-        #   "target_id": int,
-        #   "intervals": List[Tuple[datetime, Optional[datetime]]],
-        #   "offsets": Dict[state_id, float],  # hours snapshot at startup to preserve displayed values
-        # }
-        self.trackers: Dict[int, Dict] = {}
+        self.trackers: Dict[int, Tracker] = {}
         self.by_target: Dict[int, Set[int]] = {}
+        # Last published (value, uiValue) per state, keyed by timer device ID
+        self._published_states: Dict[int, Dict[str, Tuple]] = {}
+        # Refresh schedule: heap of (deadline_ts, timer_id); _refresh_deadlines holds each
+        # timer's current deadline so superseded heap entries can be skipped lazily
+        self._refresh_heap: List[Tuple[float, int]] = []
+        self._refresh_deadlines: Dict[int, float] = {}
+        # Trackers are mutated from deviceUpdated and the refresh loop; this guards
+        # their columns, window accumulators and the refresh schedule across both
+        self._tracker_lock = threading.RLock()
+        # Pending state writes: timer ID -> (device, {key: kv}); drained by the writer thread
+        self._pending_states: Dict[int, Tuple[indigo.Device, Dict[str, Dict]]] = {}
+        self._pending_cv = threading.Condition()
+        self._writer_stop = False
+        self._writer_thread: Optional[threading.Thread] = None
+        # Local copies of timer and target devices, kept current from deviceUpdated
+        # so the refresh loop never has to fetch them from the server
+        self._dev_cache: Dict[int, indigo.Device] = {}
+        # deviceUpdated callbacks rejected early: echoes of our own timer writes and
+        # devices nothing tracks. Reported (and reset) at midnight and on shutdown.
+        self._discarded_updates: Dict[str, int] = {"own": 0, "untracked": 0}
+        # Persistent transition history (opened in startup when enabled)
+        self._history: Optional[Union[HistoryStore, JournalStore]] = None
+        # Checkpointed trackers by timer ID, read in startup and used once each
+        # Snapshots (each with its 'saved_at') waiting for their timer to register:
+        # read from the checkpoint file at startup, or kept by deviceStopComm
+        self._checkpoint: Dict[int, Dict] = {}
+        self._next_checkpoint_ts: float = 0.0
+        # SQL Logger (coverage start, transitions) by target ID, read in startup for timers without history
+        self._backfill: Dict[int, Tuple[float, List[Tuple[float, int]]]] = {}
 
 
         self.logger.info("{0:=^120}".format(" End Initializing Device Timer "))
@@ -171,12 +357,171 @@ class Plugin(indigo.PluginBase):
         except Exception as exc:
             self.logger.exception(exc)
 
-        for dev in indigo.devices.iter("self"):
-            if dev.deviceTypeId == "deviceTimer":
-                self._register_tracker(dev)
+        self._open_history_store()
+        if self.checkpointMinutes:
+            self._read_checkpoint()
+            self._next_checkpoint_ts = indigo.server.getTime().timestamp() + self.checkpointMinutes * 60
+        else:
+            self._remove_checkpoint()
+
+        timer_devs = [dev for dev in indigo.devices.iter("self") if dev.deviceTypeId == "deviceTimer"]
+        if self.sqlLoggerBackfill:
+            self._read_sql_logger_backfill(timer_devs)
+        for dev in timer_devs:
+            self._register_tracker(dev)
+        # Only first registrations use the backfill; later ones carry their tracker forward
+        self._backfill = {}
+
+        self._writer_stop = False
+        self._writer_thread = threading.Thread(target=self._state_writer_loop, name="DeviceTimerStateWriter", daemon=True)
+        self._writer_thread.start()
 
     def shutdown(self) -> None:
         self.logger.debug("shutdown called")
+        # Close open intervals at shutdown: downtime counts as OFF, and a target
+        # still ON reopens its interval when the plugin starts again
+        now = indigo.server.getTime()
+        now_ts = now.timestamp()
+        with self._tracker_lock:
+            for timer_dev_id, tracker in self.trackers.items():
+                if tracker.close_interval(now_ts):
+                    self._record_transition(timer_dev_id, now_ts, TRANSITION_OFF)
+        if self.checkpointMinutes:
+            self._write_checkpoint(now)
+        self._close_history_store()
+        with self._pending_cv:
+            self._writer_stop = True
+            self._pending_cv.notify()
+        if self._writer_thread:
+            self._writer_thread.join(timeout=5.0)
+            self._writer_thread = None
+        # Anything queued after the writer exited still goes out
+        self._flush_pending_states()
+        self._report_discarded_updates()
+
+    def _open_history_store(self) -> None:
+        # Files of any other store would claim coverage of the time they did not record
+        for store in HISTORY_STORES:
+            if store != self.historyStore:
+                self._remove_history_files(store)
+        if self.historyStore == "none":
+            return
+        try:
+            store_dir = self._store_dir()
+            if self.historyStore == "journal":
+                self._history = JournalStore(path.join(store_dir, "history.journal"))
+            else:
+                self._history = HistoryStore(path.join(store_dir, "history.sqlite"))
+            self.logger.debug(f"Transition history: {self.historyStore} in {store_dir}")
+        except HISTORY_ERRORS as exc:
+            self.logger.exception(exc)
+            self._history = None
+
+    def _close_history_store(self) -> None:
+        if self._history:
+            try:
+                self._history.close()
+            except HISTORY_ERRORS as exc:
+                self.logger.exception(exc)
+            self._history = None
+
+    def _remove_history_files(self, store: str) -> None:
+        store_dir = self._store_dir()
+        try:
+            if store == "sqlite":
+                for suffix in ("", "-wal", "-shm"):
+                    if path.exists(path.join(store_dir, "history.sqlite" + suffix)):
+                        os.remove(path.join(store_dir, "history.sqlite" + suffix))
+            elif store == "journal":
+                for suffix in ("", ".tmp"):
+                    if path.exists(path.join(store_dir, "history.journal" + suffix)):
+                        os.remove(path.join(store_dir, "history.journal" + suffix))
+        except OSError as exc:
+            self.logger.exception(exc)
+
+    def _store_dir(self) -> str:
+        """Preferences/Plugins/<plugin id> in the Indigo install folder, for history and checkpoints."""
+        store_dir = path.join(indigo.server.getInstallFolderPath(), "Preferences", "Plugins", self.pluginId)
+        os.makedirs(store_dir, exist_ok=True)
+        return store_dir
+
+    def _read_checkpoint(self) -> None:
+        try:
+            with open(path.join(self._store_dir(), CHECKPOINT_FILE), "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            saved_at = float(data["saved_at"])
+            self._checkpoint = {int(timer_id): snap for timer_id, snap in data["trackers"].items()}
+            for snap in self._checkpoint.values():
+                snap["saved_at"] = float(snap.get("saved_at", saved_at))
+            self.logger.debug(f"Read checkpoint of {len(self._checkpoint)} timer(s) saved {datetime.fromtimestamp(saved_at)}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            self.logger.warning(f"Ignoring unreadable checkpoint: {exc}")
+            self._checkpoint = {}
+
+    def _remove_checkpoint(self) -> None:
+        try:
+            os.remove(path.join(self._store_dir(), CHECKPOINT_FILE))
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            self.logger.exception(exc)
+
+    def _read_sql_logger_backfill(self, timer_devs: List[indigo.Device]) -> None:
+        """Read every tracked target's recent onState history from the SQL Logger in one pass."""
+        target_ids = []
+        retention = RETENTION_SECONDS
+        for dev in timer_devs:
+            try:
+                target_ids.append(int((dev.pluginProps or {}).get("targetDeviceId", "")))
+                retention = max(retention, self._device_windows(dev)[-1][1])
+            except ValueError:
+                continue
+        if not target_ids:
+            return
+        now = indigo.server.getTime()
+        db_path = path.join(indigo.server.getInstallFolderPath(), "Logs", SQL_LOGGER_DB)
+        if not path.exists(db_path):
+            self.logger.warning(f"SQL Logger backfill is on but {db_path} was not found (SQLite SQL Logger only).")
+            return
+        try:
+            since_ts = min(now.timestamp() - retention, self._yesterday_start(now).timestamp())
+            self._backfill = {
+                target_id: (covered_since, backfill_transitions(changes))
+                for target_id, (covered_since, changes) in read_state_changes(db_path, target_ids, since_ts).items()
+            }
+            self.logger.info(f"SQL Logger backfill: history found for {len(self._backfill)} of {len(set(target_ids))} target device(s)")
+        except (sqlite3.Error, ValueError) as exc:
+            self.logger.exception(exc)
+            self._backfill = {}
+
+    def _write_checkpoint(self, now: datetime) -> None:
+        """Snapshot every tracker to the checkpoint file (write to a temp file, then rename over)."""
+        with self._tracker_lock:
+            # Stopped timers keep the snapshot they were stopped with
+            trackers = {str(timer_dev_id): snap for timer_dev_id, snap in self._checkpoint.items()}
+            for timer_dev_id, tracker in list(self.trackers.items()):
+                trackers[str(timer_dev_id)] = dict(tracker.snapshot(), saved_at=now.timestamp())
+            data = {"saved_at": now.timestamp(), "trackers": trackers}
+        try:
+            checkpoint_path = path.join(self._store_dir(), CHECKPOINT_FILE)
+            tmp_path = checkpoint_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, separators=(",", ":"), default=str)
+            os.replace(tmp_path, checkpoint_path)
+            self.logger.debug(f"Checkpointed {len(data['trackers'])} timer(s)")
+        except (OSError, TypeError, ValueError) as exc:
+            self.logger.exception(exc)
+
+    def _record_transition(self, timer_dev_id: int, ts: float, kind: int) -> None:
+        if self._history:
+            self._history.record(timer_dev_id, ts, kind)
+
+    def _report_discarded_updates(self) -> None:
+        own, untracked = self._discarded_updates["own"], self._discarded_updates["untracked"]
+        self.logger.info(f"deviceUpdated callbacks discarded: {own} own timer updates, {untracked} untracked devices")
+        self._discarded_updates = {"own": 0, "untracked": 0}
 
     ########################################
     def closedPrefsConfigUi(self, values_dict: indigo.Dict, user_cancelled: bool) -> None:
@@ -189,11 +534,31 @@ class Plugin(indigo.PluginBase):
             self.pluginPrefs["showDebugInfo"] = bool(values_dict.get("showDebugInfo", False))
             self.pluginPrefs["showDebugLevel"] = int(values_dict.get("showDebugLevel", logging.INFO))
             self.pluginPrefs["showDebugFileLevel"] = int(values_dict.get("showDebugFileLevel", logging.DEBUG))
+            self.pluginPrefs["windowEngine"] = values_dict.get("windowEngine", "sweep")
+            self.pluginPrefs["textFormat"] = values_dict.get("textFormat", "long")
+            self.pluginPrefs["refreshMode"] = values_dict.get("refreshMode", "burst")
+            self.pluginPrefs["historyStore"] = values_dict.get("historyStore", "sqlite")
+            self.pluginPrefs["checkpointMinutes"] = values_dict.get("checkpointMinutes", str(CHECKPOINT_MINUTES_DEFAULT))
+            self.pluginPrefs["sqlLoggerBackfill"] = bool(values_dict.get("sqlLoggerBackfill", False))
             indigo.server.savePluginPrefs()
 
             self.debug = bool(values_dict.get("showDebugInfo", False))
             self.logLevel = int(values_dict.get("showDebugLevel", logging.INFO))
             self.fileloglevel = int(values_dict.get("showDebugFileLevel", logging.DEBUG))
+            self.windowEngine = self._validated_window_engine(values_dict.get("windowEngine", "sweep"))
+            self.textFormat = self._validated_text_format(values_dict.get("textFormat", "long"))
+            self.refreshMode = self._validated_refresh_mode(values_dict.get("refreshMode", "burst"))
+            self.checkpointMinutes = self._validated_checkpoint_minutes(values_dict.get("checkpointMinutes", CHECKPOINT_MINUTES_DEFAULT))
+            if not self.checkpointMinutes:
+                # A checkpoint left behind would be stale by the time checkpoints are turned back on
+                self._remove_checkpoint()
+            self.sqlLoggerBackfill = bool(values_dict.get("sqlLoggerBackfill", False))
+            history_store = self._validated_history_store(values_dict.get("historyStore", "sqlite"))
+            if history_store != self.historyStore:
+                self._close_history_store()
+                self.historyStore = history_store
+                self._open_history_store()
+                self.logger.info(f"Transition history: {self.historyStore} (restored on the next restart)")
 
             self.logLevel = int(values_dict.get("showDebugLevel", '5'))
             self.fileloglevel = int(values_dict.get("showDebugFileLevel", '5'))
@@ -216,13 +581,91 @@ class Plugin(indigo.PluginBase):
 
 
             self.logger.info(f"Applied logging prefs: EventLog={logging.getLevelName(self.logLevel)}, File={logging.getLevelName(self.fileloglevel)}, Debug={'on' if self.debug else 'off'}")
+            self.logger.info(f"Rolling window engine: {self.windowEngine}, duration text format: {self.textFormat}, refresh: {self.refreshMode}")
         except Exception as exc:
             self.logger.exception(exc)
 
+    def _validated_window_engine(self, engine: str) -> str:
+        if engine not in WINDOW_ENGINES:
+            return "sweep"
+        if engine == "numpy" and np is None:
+            self.logger.warning("NumPy is not available; using the sweep window engine instead.")
+            return "sweep"
+        return engine
+
+    def _validated_text_format(self, style: str) -> str:
+        return style if style in TEXT_FORMATS else "long"
+
+    def _validated_refresh_mode(self, mode: str) -> str:
+        return mode if mode in REFRESH_MODES else "burst"
+
+    def _validated_history_store(self, store: str) -> str:
+        return store if store in HISTORY_STORES else "sqlite"
+
+    def _validated_checkpoint_minutes(self, minutes) -> int:
+        try:
+            return max(0, int(minutes))
+        except (TypeError, ValueError):
+            return CHECKPOINT_MINUTES_DEFAULT
+
+    ########################################
+    def getDeviceStateList(self, dev: indigo.Device) -> indigo.List:
+        """
+        Devices.xml declares the default windows; swap them for this device's own
+        window set, generating states for any windows it does not declare.
+        """
+        state_list = super().getDeviceStateList(dev)
+        if dev.deviceTypeId != "deviceTimer":
+            return state_list
+
+        windows = self._device_windows(dev)
+        default_keys: Set[str] = set()
+        for state_id, _ in WINDOWS:
+            default_keys.update((state_id, f"{state_id}_text", count_state_id(state_id)))
+        wanted_keys: Set[str] = set()
+        for state_id, _ in windows:
+            wanted_keys.update((state_id, f"{state_id}_text", count_state_id(state_id)))
+
+        present: Set[str] = set()
+        trimmed = indigo.List()
+        for state in state_list:
+            key = state["Key"]
+            if key in default_keys and key not in wanted_keys:
+                continue
+            present.add(key)
+            trimmed.append(state)
+
+        for state_id, _ in windows:
+            if state_id in present:
+                continue
+            long_label, short_label = window_labels(state_id)
+            trimmed.append(self.getDeviceStateDictForNumberType(state_id, f"On Time ({long_label})", f"On Time ({short_label})"))
+            trimmed.append(self.getDeviceStateDictForStringType(f"{state_id}_text", f"On Time ({short_label}, text)", f"On Time ({short_label}, text)"))
+            trimmed.append(self.getDeviceStateDictForIntegerType(count_state_id(state_id), f"On Count ({long_label})", f"On Count ({short_label})"))
+        return trimmed
+
+    def _device_windows(self, dev: indigo.Device) -> List[Tuple[str, int]]:
+        spec = (dev.pluginProps or {}).get("windows", "") or DEFAULT_WINDOW_SPEC
+        try:
+            return parse_window_spec(spec)
+        except ValueError as exc:
+            self.logger.warning(f"'{dev.name}' has an invalid window list ({exc}); using the defaults.")
+            return WINDOWS
+
+    def _device_debounce(self, dev: indigo.Device) -> Tuple[float, float]:
+        """(debounce_seconds, min_on_seconds) from the timer's config; 0 disables either."""
+        props = dev.pluginProps or {}
+        try:
+            return max(0.0, float(props.get("debounceSeconds", 0) or 0)), max(0.0, float(props.get("minOnSeconds", 0) or 0))
+        except (TypeError, ValueError):
+            self.logger.warning(f"'{dev.name}' has an invalid debounce setting; debounce disabled.")
+            return 0.0, 0.0
+
     ########################################
     def deviceStartComm(self, dev: indigo.Device) -> None:
         if dev.deviceTypeId == "deviceTimer":
-            self._register_tracker(dev)
+            with self._tracker_lock:
+                self._register_tracker(dev)
             dev.stateListOrDisplayStateIdChanged()
             try:
                 dev.updateStateImageOnServer(indigo.kStateImageSel.TimerOn)
@@ -231,38 +674,40 @@ class Plugin(indigo.PluginBase):
 
     def deviceStopComm(self, dev: indigo.Device) -> None:
         if dev.deviceTypeId == "deviceTimer":
-            self._unregister_tracker(dev)
-
-    # ADD
-    def _compute_on_seconds_between(
-            self,
-            intervals: List[Tuple[datetime, Optional[datetime]]],
-            start_ts: datetime,
-            end_ts: datetime
-    ) -> float:
-        total = 0.0
-        for s, e in intervals:
-            s0 = s
-            e0 = e or end_ts
-            if e0 <= start_ts or s0 >= end_ts:
-                continue
-            overlap_start = max(s0, start_ts)
-            overlap_end = min(e0, end_ts)
-            if overlap_end > overlap_start:
-                total += (overlap_end - overlap_start).total_seconds()
-        return total
+            now_ts = indigo.server.getTime().timestamp()
+            with self._tracker_lock:
+                tracker = self.trackers.get(dev.id)
+                if tracker is not None:
+                    # Time while stopped counts as OFF, as across a plugin restart
+                    if tracker.close_interval(now_ts):
+                        self._record_transition(dev.id, now_ts, TRANSITION_OFF)
+                    # Indigo stops comm before restarting it (config edits, disable/enable),
+                    # so keep the tracker for the next deviceStartComm
+                    self._checkpoint[dev.id] = dict(tracker.snapshot(), saved_at=now_ts)
+                self._unregister_tracker(dev)
+
+    def deviceDeleted(self, dev: indigo.Device) -> None:
+        super().deviceDeleted(dev)
+        self._dev_cache.pop(dev.id, None)
+        self._checkpoint.pop(dev.id, None)
+        if self._history and dev.pluginId == self.pluginId:
+            try:
+                self._history.forget(dev.id)
+            except HISTORY_ERRORS as exc:
+                self.logger.exception(exc)
+
+    def _cached_device(self, dev_id: int) -> Optional[indigo.Device]:
+        """Device from the local cache, fetched from the server only on a miss."""
+        dev = self._dev_cache.get(dev_id)
+        if dev is None:
+            dev = indigo.devices.get(dev_id)
+            if dev is not None:
+                self._dev_cache[dev_id] = dev
+        return dev
 
     # ADD
     def _format_duration_text(self, total_seconds: float) -> str:
-        secs = int(round(total_seconds))
-        hours = secs // 3600
-        mins = (secs % 3600) // 60
-        parts = []
-        if hours > 0:
-            parts.append(f"{hours} hour" + ("s" if hours != 1 else ""))
-        if mins > 0 or hours == 0:
-            parts.append(f"{mins} min" + ("s" if mins != 1 else ""))
-        return " and ".join(parts)
+        return format_duration(int(round(total_seconds)) // 60, self.textFormat)
     ########################################
     def all_devices(
         self,
@@ -282,19 +727,26 @@ class Plugin(indigo.PluginBase):
 
     ########################################
     def deviceUpdated(self, orig_dev: indigo.Device, new_dev: indigo.Device) -> None:
-        super().deviceUpdated(orig_dev, new_dev)
-
-        timer_ids = self.by_target.get(new_dev.id, set())
+        timer_ids = self.by_target.get(new_dev.id)
         if not timer_ids:
+            # Fast reject: our own state writes echo back here, as does every change to
+            # devices nothing tracks. Only a config change on one of our own devices
+            # needs the base class (it restarts the device's comm).
+            if new_dev.pluginId == self.pluginId:
+                if new_dev.id in self._dev_cache:
+                    self._dev_cache[new_dev.id] = new_dev
+                if orig_dev.pluginProps == new_dev.pluginProps:
+                    self._discarded_updates["own"] += 1
+                    return
+                super().deviceUpdated(orig_dev, new_dev)
+            else:
+                self._discarded_updates["untracked"] += 1
             return
 
-        self.logger.debug(f"deviceUpdated: target '{new_dev.name}' ({new_dev.id}) has {len(timer_ids)} timer(s) tracking it")
+        super().deviceUpdated(orig_dev, new_dev)
+        self._dev_cache[new_dev.id] = new_dev
 
-        # Always refresh metadata on any update
-        for timer_dev_id in list(timer_ids):
-            timer_dev = indigo.devices.get(timer_dev_id)
-            if timer_dev:
-                self._update_target_meta_states(timer_dev, new_dev)
+        self.logger.debug(f"deviceUpdated: target '{new_dev.name}' ({new_dev.id}) has {len(timer_ids)} timer(s) tracking it")
 
         old_on = getattr(orig_dev, "onState", None)
         new_on = getattr(new_dev, "onState", None)
@@ -304,34 +756,53 @@ class Plugin(indigo.PluginBase):
             if old_on != new_on:
                 self.logger.debug(f"Tracked device change: '{new_dev.name}' (id {new_dev.id}) onState {old_on} -> {new_on}")
 
-        # If device doesn't support on/off or no transition, stop here
+        # If device doesn't support on/off or no transition, only the metadata can have changed
         if (old_on is None and new_on is None) or (old_on == new_on):
+            for timer_dev_id in list(timer_ids):
+                tracker = self.trackers.get(timer_dev_id)
+                # Brightness, property and similar updates leave the metadata untouched
+                if not tracker or not self._changed_target_meta_kv(tracker, new_dev):
+                    continue
+                timer_dev = self._cached_device(timer_dev_id)
+                if timer_dev:
+                    self._update_target_meta_states(timer_dev, new_dev)
             return
 
         now = indigo.server.getTime()
-        for timer_dev_id in list(timer_ids):
-            tracker = self.trackers.get(timer_dev_id)
-            if not tracker:
-                continue
-
-            intervals: List[Tuple[datetime, Optional[datetime]]] = tracker["intervals"]
-
-            if new_on is True:
-                if not (intervals and intervals[-1][1] is None):
-                    intervals.append((now, None))
-                    # Record an ON event timestamp for counting
-                tracker.setdefault("on_events", []).append(now)
-                td = indigo.devices.get(timer_dev_id)
-                tname = td.name if td else f"id {timer_dev_id}"
-                self.logger.debug(f"Recorded ON event for '{tname}' at {now}")
-            else:
-                if intervals and intervals[-1][1] is None:
-                    start, _ = intervals[-1]
-                    intervals[-1] = (start, now)
-
-            timer_dev = indigo.devices.get(timer_dev_id)
-            if timer_dev:
-                self._update_timer_states(timer_dev, tracker, now)
+        now_ts = now.timestamp()
+        with self._tracker_lock:
+            for timer_dev_id in list(timer_ids):
+                tracker = self.trackers.get(timer_dev_id)
+                if not tracker:
+                    continue
+
+                # A transition within the debounce time of the previous one is still chatter
+                settling = now_ts - tracker.last_transition_ts < tracker.debounce_seconds
+                tracker.last_transition_ts = now_ts
+
+                if new_on is True:
+                    if tracker.resume_interval(now_ts):
+                        self._record_transition(timer_dev_id, now_ts, TRANSITION_ON)
+                        self.logger.debug(f"Debounced ON for timer id {timer_dev_id}: continuing previous interval")
+                    elif tracker.open_interval(now_ts):
+                        # Record an ON event timestamp for counting
+                        tracker.record_on_event(now_ts)
+                        self._record_transition(timer_dev_id, now_ts, TRANSITION_ON)
+                        self.logger.debug(f"Recorded ON event for timer id {timer_dev_id} at {now}")
+                elif tracker.close_interval(now_ts):
+                    self._record_transition(timer_dev_id, now_ts, TRANSITION_OFF)
+
+                if settling:
+                    # Hold back intermediate states; the refresh loop publishes once it settles
+                    self._schedule_refresh(timer_dev_id, now_ts + tracker.debounce_seconds)
+                    continue
+
+                timer_dev = self._cached_device(timer_dev_id)
+                if timer_dev:
+                    # Metadata and timer states go out together in one update
+                    self._update_timer_states(timer_dev, tracker, now, target_dev=new_dev)
+                    # Just published; no need for the refresh loop to repeat it straight away
+                    self._schedule_refresh(timer_dev_id, self._next_refresh_deadline(timer_dev_id, tracker, now))
 
     ########################################
     # Function: runConcurrentThread (midnight block only, around L190-L245)
@@ -341,6 +812,7 @@ class Plugin(indigo.PluginBase):
         try:
             while True:
                 now = indigo.server.getTime()
+                now_ts = now.timestamp()
 
                 # Midnight rollover detection and logging
                 try:
@@ -348,90 +820,155 @@ class Plugin(indigo.PluginBase):
                         self._current_date = now.date()
                     elif now.date() != self._current_date:
                         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                        yday_start = today_start - timedelta(days=1)
+                        today_ts = today_start.timestamp()
+                        yday_ts = (today_start - timedelta(days=1)).timestamp()
                         self.logger.info(f"Midnight rollover: {self._current_date} -> {now.date()}")
-                        for timer_dev_id, tracker in list(self.trackers.items()):
-                            timer_dev = indigo.devices.get(timer_dev_id)
-                            if not timer_dev:
-                                continue
-                            intervals: List[Tuple[datetime, Optional[datetime]]] = tracker["intervals"]
-
-                            # Finished day totals (minutes) = interval sum for yday + baseline 'today'
-                            seconds_finished_day = self._compute_on_seconds_between(intervals, yday_start, today_start)
-                            minutes_finished_day_since = round(seconds_finished_day / 60.0, 1)
-                            minutes_finished_day_total = round(
-                                minutes_finished_day_since + float(tracker.get("day_offsets", {}).get("today", 0.0)), 1)
-
-                            # Finished day ON event counts = observed in yday + baseline 'today'
-                            on_events = tracker.get("on_events", [])
-                            yday_count_since = sum(1 for t in on_events if yday_start <= t < today_start)
-                            yday_count_total = int(
-                                yday_count_since + int(tracker.get("count_offsets", {}).get("today", 0)))
-
-                            self.logger.info(
-                                f"Yesterday total for '{timer_dev.name}': {minutes_finished_day_total:.1f} min; "
-                                f"On events: {yday_count_total}; Today starts at 0.0"
-                            )
-
-                            # Roll baselines: yesterday becomes finished day, reset today's baselines
-                            tracker["day_offsets"] = {"today": 0.0, "yesterday": minutes_finished_day_total}
-                            tracker["count_offsets"] = {"today": 0, "yesterday": yday_count_total}
-                             # Lock yesterday for the new day so we don't add interval-based 'since' again
-                            tracker["yesterday_locked_for_date"] = now.date()
+                        with self._tracker_lock:
+                            for timer_dev_id, tracker in list(self.trackers.items()):
+                                timer_dev = self._cached_device(timer_dev_id)
+                                if not timer_dev:
+                                    continue
+                                minutes_finished_day_total, yday_count_total = self._roll_day(tracker, now)
+                                self.logger.info(
+                                    f"Yesterday total for '{timer_dev.name}': {minutes_finished_day_total:.1f} min; "
+                                    f"On events: {yday_count_total}; Today starts at 0.0"
+                                )
+                                if self._history:
+                                    self._history.prune(timer_dev_id, min(now_ts - tracker.retention_seconds, yday_ts))
                         self._current_date = now.date()
+                        self._report_discarded_updates()
                 except Exception as exc:
                     self.logger.exception(exc)
 
-                for timer_dev_id, tracker in list(self.trackers.items()):
-                    timer_dev = indigo.devices.get(timer_dev_id)
-                    if not timer_dev:
-                        continue
-
-                    intervals: List[Tuple[datetime, Optional[datetime]]] = tracker["intervals"]
-
-                    # Prune old intervals
-                    self._prune_intervals(intervals, now)
-                    # Prune old ON event timestamps (keep only yesterday/today)
-                    self._prune_on_events(tracker.setdefault("on_events", []), now)
-
-                    # Refresh target metadata frequently
-                    target_id = tracker.get("target_id")
-                    target_dev = indigo.devices.get(target_id) if target_id is not None else None
-                    if target_dev:
-                        self._update_target_meta_states(timer_dev, target_dev)
-                        current_on = getattr(target_dev, "onState", None)
-                        if current_on and not (intervals and intervals[-1][1] is None):
-                            intervals.append((now, None))
-                            self.logger.debug(f"Opened interval for timer '{timer_dev.name}' due to target ON")
+                with self._tracker_lock:
+                    refresh: List[Tuple[indigo.Device, Tracker, Optional[indigo.Device]]] = []
+                    for timer_dev_id in self._pop_due_refreshes(now_ts):
+                        tracker = self.trackers.get(timer_dev_id)
+                        if not tracker:
+                            continue
+                        timer_dev = self._cached_device(timer_dev_id)
+                        if not timer_dev:
+                            continue
+
+                        # Prune old intervals and ON event timestamps (keep the longest window and yesterday/today)
+                        tracker.prune(now_ts, self._yesterday_start(now).timestamp())
+
+                        # Refresh target metadata frequently (published with the timer states)
+                        target_id = tracker.target_id
+                        target_dev = self._cached_device(target_id) if target_id is not None else None
+                        if target_dev:
+                            current_on = getattr(target_dev, "onState", None)
+                            if current_on and tracker.open_interval(now_ts):
+                                self._record_transition(timer_dev_id, now_ts, TRANSITION_OPEN)
+                                self.logger.debug(f"Opened interval for timer '{timer_dev.name}' due to target ON")
+                        refresh.append((timer_dev, tracker, target_dev))
 
                     # Keep timers live
-                    self._update_timer_states(timer_dev, tracker, now)
-
-                self.sleep(REFRESH_INTERVAL_SECS)
+                    batch: Dict[int, List[float]] = {}
+                    if self.windowEngine == "numpy" and refresh:
+                        try:
+                            batch = self._batch_sweep(refresh, now)
+                        except Exception as exc:
+                            self.logger.exception(exc)
+                    for timer_dev, tracker, target_dev in refresh:
+                        self._update_timer_states(timer_dev, tracker, now, batch.get(timer_dev.id), target_dev)
+                        self._schedule_refresh(timer_dev.id, self._next_refresh_deadline(timer_dev.id, tracker, now))
+
+                # Transitions buffered since the last pass go to the history in one batch
+                if self._history:
+                    try:
+                        self._history.flush()
+                    except HISTORY_ERRORS as exc:
+                        self.logger.exception(exc)
+
+                if self.checkpointMinutes and now_ts >= self._next_checkpoint_ts:
+                    self._write_checkpoint(now)
+                    self._next_checkpoint_ts = now_ts + self.checkpointMinutes * 60
+
+                self.sleep(self._seconds_until_next_refresh(now))
         except self.StopThread:
             pass
 
+    ########################################
+    # Refresh scheduling
+    def _schedule_refresh(self, timer_dev_id: int, deadline_ts: float) -> None:
+        self._refresh_deadlines[timer_dev_id] = deadline_ts
+        heapq.heappush(self._refresh_heap, (deadline_ts, timer_dev_id))
+
+    def _pop_due_refreshes(self, now_ts: float) -> List[int]:
+        """Timer IDs whose current deadline has passed, earliest first."""
+        due: List[int] = []
+        heap = self._refresh_heap
+        while heap and heap[0][0] <= now_ts:
+            deadline_ts, timer_dev_id = heapq.heappop(heap)
+            # Skip entries superseded by a later reschedule or an unregister
+            if self._refresh_deadlines.get(timer_dev_id) == deadline_ts:
+                del self._refresh_deadlines[timer_dev_id]
+                due.append(timer_dev_id)
+        return due
+
+    def _refresh_phase(self, timer_dev_id: int) -> float:
+        """This timer's slot within REFRESH_INTERVAL_SECS (multiplicative hash of its ID)."""
+        return ((timer_dev_id * 2654435761) % 2**32) / 2**32 * REFRESH_INTERVAL_SECS
+
+    def _next_slot(self, timer_dev_id: int, earliest_ts: float) -> float:
+        """First time at or after earliest_ts that falls on this timer's slot."""
+        return earliest_ts + (self._refresh_phase(timer_dev_id) - earliest_ts) % REFRESH_INTERVAL_SECS
+
+    def _first_refresh_deadline(self, timer_dev_id: int, now_ts: float) -> float:
+        if self.refreshMode == "staggered":
+            return self._next_slot(timer_dev_id, now_ts)
+        return now_ts
+
+    def _next_refresh_deadline(self, timer_dev_id: int, tracker: Tracker, now: datetime) -> float:
+        """
+        When this timer next shows a different value. Without a target only the
+        midnight roll changes anything. Otherwise something moves every
+        DISPLAY_STEP_SECS (the timeon_* minutes while the target is ON,
+        timeoff_today while it is OFF), so refresh at that resolution but no more
+        often than REFRESH_INTERVAL_SECS. Never later than the next midnight.
+
+        In staggered mode the deadline is instead the timer's next slot at least
+        DISPLAY_STEP_SECS away; slots repeat every REFRESH_INTERVAL_SECS, so each
+        timer still refreshes once per period, at its own point in it.
+        """
+        midnight_ts = (now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+        if tracker.target_id is None:
+            return midnight_ts
+        if self.refreshMode == "staggered":
+            return min(self._next_slot(timer_dev_id, now.timestamp() + DISPLAY_STEP_SECS), midnight_ts)
+        return min(now.timestamp() + max(DISPLAY_STEP_SECS, REFRESH_INTERVAL_SECS), midnight_ts)
+
+    def _seconds_until_next_refresh(self, now: datetime) -> float:
+        # Wake at the earliest deadline, but at least every REFRESH_INTERVAL_SECS so
+        # newly registered timers are picked up promptly
+        now_ts = now.timestamp()
+        wake_ts = now_ts + REFRESH_INTERVAL_SECS
+        if self._refresh_heap:
+            wake_ts = min(wake_ts, self._refresh_heap[0][0])
+        return max(0.1, wake_ts - now_ts)
+
     ########################################
     # Helpers
     # Function: _register_tracker (around L300-L370)
     # - Read current device states for today/yesterday minutes and counts into baselines at startup.
     def _register_tracker(self, timer_dev: indigo.Device) -> None:
+        # A re-registration without a comm stop (startup, then deviceStartComm) carries
+        # the running tracker forward; after a comm stop its snapshot is in _checkpoint
+        previous = self.trackers.get(timer_dev.id)
         self._unregister_tracker(timer_dev)
+        self._dev_cache[timer_dev.id] = timer_dev
 
         props = timer_dev.pluginProps or {}
         target_str = props.get("targetDeviceId", "")
         if not target_str:
             self.logger.warning(f"'{timer_dev.name}' has no target device selected.")
             self._update_target_meta_states(timer_dev, None)
-            self.trackers[timer_dev.id] = {
-                "target_id": None,
-                "intervals": [],
-                "offsets": {},
-                "day_offsets": {"today": 0.0, "yesterday": 0.0},
-                "count_offsets": {"today": 0, "yesterday": 0},
-                "on_events": [],
-                "yesterday_locked_for_date": indigo.server.getTime().date(),
-            }
+            self.trackers[timer_dev.id] = Tracker(
+                yesterday_locked_for_date=indigo.server.getTime().date(),
+                windows=self._device_windows(timer_dev),
+            )
+            self._schedule_refresh(timer_dev.id, self._first_refresh_deadline(timer_dev.id, indigo.server.getTime().timestamp()))
             return
 
         try:
@@ -439,40 +976,97 @@ class Plugin(indigo.PluginBase):
         except ValueError:
             self.logger.error(f"'{timer_dev.name}' invalid targetDeviceId: {target_str}")
             self._update_target_meta_states(timer_dev, None)
-            self.trackers[timer_dev.id] = {
-                "target_id": None,
-                "intervals": [],
-                "offsets": {},
-                "day_offsets": {"today": 0.0, "yesterday": 0.0},
-                "count_offsets": {"today": 0, "yesterday": 0},
-                "on_events": [],
-            }
+            self.trackers[timer_dev.id] = Tracker(windows=self._device_windows(timer_dev))
+            self._schedule_refresh(timer_dev.id, self._first_refresh_deadline(timer_dev.id, indigo.server.getTime().timestamp()))
             return
 
         now = indigo.server.getTime()
-        intervals: List[Tuple[datetime, Optional[datetime]]] = []
+        open_at_start = False
+        windows = self._device_windows(timer_dev)
+        debounce_seconds, min_on_seconds = self._device_debounce(timer_dev)
 
         target_dev = indigo.devices.get(target_id)
         if target_dev:
+            self._dev_cache[target_id] = target_dev
             current_on = getattr(target_dev, "onState", None)
             if current_on:
-                intervals.append((now, None))
+                open_at_start = True
                 self.logger.debug(f"Opened interval at startup for '{timer_dev.name}' (target ON)")
         else:
             self.logger.warning(f"'{timer_dev.name}' target device id {target_id} not found.")
 
-        # Baselines for rolling windows (minutes)
+        checkpoint = self._checkpoint.pop(timer_dev.id, None)
+        target_changed = self._target_changed(timer_dev, target_id, previous, checkpoint)
+        if target_changed and self._history:
+            # Stored history and the timer's states belong to the previous target
+            self.logger.info(f"'{timer_dev.name}' now tracks device id {target_id}; starting its history afresh")
+            try:
+                self._history.forget(timer_dev.id)
+            except HISTORY_ERRORS as exc:
+                self.logger.exception(exc)
+        tracker = None
+        if previous is not None and previous.target_id == target_id:
+            tracker = self._tracker_from_checkpoint(
+                timer_dev, previous.snapshot(), now.timestamp(), target_id, windows, debounce_seconds, min_on_seconds, now)
+        elif checkpoint is not None and checkpoint.get("target_id") == target_id:
+            tracker = self._tracker_from_checkpoint(
+                timer_dev, checkpoint, checkpoint["saved_at"], target_id, windows, debounce_seconds, min_on_seconds, now)
+        if tracker is None:
+            tracker = self._tracker_from_states(timer_dev, target_id, windows, debounce_seconds, min_on_seconds, now)
+            if target_changed:
+                tracker.reset_baselines()
+        if open_at_start:
+            if tracker.open_interval(now.timestamp()):
+                self._record_transition(timer_dev.id, now.timestamp(), TRANSITION_OPEN)
+        elif tracker.is_open and tracker.close_interval(now.timestamp()):
+            # History ends ON (no clean shutdown) but the target is not ON now
+            self._record_transition(timer_dev.id, now.timestamp(), TRANSITION_OFF)
+        self.trackers[timer_dev.id] = tracker
+        self._schedule_refresh(timer_dev.id, self._first_refresh_deadline(timer_dev.id, now.timestamp()))
+        self.by_target.setdefault(target_id, set()).add(timer_dev.id)
+        self.logger.debug(f"Registered '{timer_dev.name}' -> target id {target_id} (intervals: {tracker.interval_count})")
+        self._update_target_meta_states(timer_dev, target_dev)
+
+    def _target_changed(self, timer_dev: indigo.Device, target_id: int, previous: Optional[Tracker], checkpoint: Optional[Dict]) -> bool:
+        """Whether the timer last tracked a different device (per its tracker, its checkpoint or its published states)."""
+        if previous is not None:
+            last_target_id = previous.target_id
+        elif checkpoint is not None:
+            last_target_id = checkpoint.get("target_id")
+        else:
+            try:
+                last_target_id = int(timer_dev.states.get("target_device_id", 0) or 0)
+            except (TypeError, ValueError):
+                last_target_id = 0
+        return bool(last_target_id) and last_target_id != target_id
+
+    def _tracker_from_states(
+            self,
+            timer_dev: indigo.Device,
+            target_id: int,
+            windows: List[Tuple[str, int]],
+            debounce_seconds: float,
+            min_on_seconds: float,
+            now: datetime
+    ) -> Tracker:
+        """New tracker whose baselines are the timer's current states, trimmed by any stored history."""
+        # Baselines for rolling windows (minutes) and rolling ON-event counts
         offsets: Dict[str, float] = {}
         try:
-            for state_id, _ in WINDOWS:
+            for state_id, _ in windows:
                 v = timer_dev.states.get(state_id, 0)
                 try:
                     offsets[state_id] = float(v)
                 except Exception:
                     offsets[state_id] = 0.0
+                v = timer_dev.states.get(count_state_id(state_id), 0)
+                try:
+                    offsets[count_state_id(state_id)] = int(v)
+                except Exception:
+                    offsets[count_state_id(state_id)] = 0
             self.logger.debug(
                 f"Captured rolling offsets for '{timer_dev.name}': " +
-                ", ".join([f"{k}={offsets[k]:.1f}" for k, _ in WINDOWS])
+                ", ".join([f"{k}={offsets[k]:.1f}/{offsets[count_state_id(k)]}" for k, _ in windows])
             )
         except Exception as exc:
             self.logger.exception(exc)
@@ -505,27 +1099,114 @@ class Plugin(indigo.PluginBase):
         except Exception as exc:
             self.logger.exception(exc)
 
-        self.trackers[timer_dev.id] = {
-            "target_id": target_id,  # or None in the no-target branch
-            "intervals": intervals,
-            "offsets": offsets,
-            "day_offsets": day_offsets,
-            "count_offsets": count_offsets,
-            "on_events": [],
-            "yesterday_locked_for_date": indigo.server.getTime().date(),  # lock for the current date
-        }
-        self.by_target.setdefault(target_id, set()).add(timer_dev.id)
-        self.logger.debug(f"Registered '{timer_dev.name}' -> target id {target_id} (intervals: {len(intervals)})")
-        self._update_target_meta_states(timer_dev, target_dev)
+        tracker = Tracker(
+            target_id=target_id,
+            offsets=offsets,
+            day_offsets=day_offsets,
+            count_offsets=count_offsets,
+            yesterday_locked_for_date=indigo.server.getTime().date(),  # lock for the current date
+            windows=windows,
+            debounce_seconds=debounce_seconds,
+            min_on_seconds=min_on_seconds,
+        )
+        tracker.covered_since = now.timestamp()
+        has_history = self._restore_history(timer_dev, tracker, now) if self._history else False
+        backfill = self._backfill.get(target_id)
+        if backfill and not has_history:
+            # Reconcile even without transitions: a target OFF all along needs no baselines either
+            covered_since, transitions = backfill
+            tracker.replay(transitions)
+            tracker.reconcile_baselines(covered_since, now)
+            self.logger.info(
+                f"Backfilled '{timer_dev.name}' from the SQL Logger: {tracker.interval_count} interval(s) "
+                f"since {datetime.fromtimestamp(covered_since)}"
+            )
+        return tracker
+
+    def _tracker_from_checkpoint(
+            self,
+            timer_dev: indigo.Device,
+            checkpoint: Dict,
+            saved_ts: float,
+            target_id: int,
+            windows: List[Tuple[str, int]],
+            debounce_seconds: float,
+            min_on_seconds: float,
+            now: datetime
+    ) -> Optional[Tracker]:
+        """
+        Tracker resumed from a snapshot (the checkpoint file, or the tracker being
+        replaced): intervals, ON events and baselines as they were at saved_ts, plus
+        any history recorded after that (e.g. after a crash), with midnights missed
+        while stopped rolled over. None when the snapshot predates the stored history.
+        """
+        tracker = Tracker(
+            target_id=target_id,
+            windows=windows,
+            debounce_seconds=debounce_seconds,
+            min_on_seconds=min_on_seconds,
+        )
+        tracker.restore(checkpoint)
+        if self._history:
+            try:
+                since, transitions = self._history.load(timer_dev.id, saved_ts, now.timestamp())
+            except HISTORY_ERRORS as exc:
+                self.logger.exception(exc)
+            else:
+                if since > saved_ts:
+                    # The history began after this snapshot, so what happened in between is unknown
+                    self.logger.debug(f"Ignoring the checkpoint for '{timer_dev.name}': older than its history")
+                    return None
+                tracker.replay([(ts, kind) for ts, kind in transitions if ts > saved_ts])
+                if "covered_since" not in checkpoint:
+                    tracker.covered_since = since
+
+        saved_day = datetime.fromtimestamp(saved_ts).date()
+        if saved_day < now.date():
+            if saved_day < now.date() - timedelta(days=1):
+                # The saved 'today' baselines belong to a day before yesterday
+                tracker.day_offsets["today"] = 0.0
+                tracker.count_offsets["today"] = 0
+            self._roll_day(tracker, now)
+        # Saved baselines already exclude the saved intervals; only drop the ones now fully covered
+        tracker.expire_baselines(now)
+        self.logger.debug(f"Resumed '{timer_dev.name}' from snapshot ({tracker.interval_count} intervals)")
+        return tracker
+
+    def _restore_history(self, timer_dev: indigo.Device, tracker: Tracker, now: datetime) -> bool:
+        """
+        Rebuild the tracker's intervals and ON events from the history store and
+        trim its baselines to match. Returns whether the history began before now.
+        """
+        now_ts = now.timestamp()
+        yday_ts = self._yesterday_start(now).timestamp()
+        try:
+            since, transitions = self._history.load(timer_dev.id, min(now_ts - tracker.retention_seconds, yday_ts), now_ts)
+        except HISTORY_ERRORS as exc:
+            self.logger.exception(exc)
+            return False
+        tracker.replay(transitions)
+        tracker.reconcile_baselines(since, now)
+        self.logger.debug(
+            f"Restored {tracker.interval_count} interval(s) for '{timer_dev.name}' from history "
+            f"kept since {datetime.fromtimestamp(since)}"
+        )
+        return since < now_ts
 
     def _unregister_tracker(self, timer_dev: indigo.Device) -> None:
+        self._published_states.pop(timer_dev.id, None)
+        with self._pending_cv:
+            self._pending_states.pop(timer_dev.id, None)
+        self._refresh_deadlines.pop(timer_dev.id, None)
+        self._dev_cache.pop(timer_dev.id, None)
         existing = self.trackers.pop(timer_dev.id, None)
         if existing:
-            tgt = existing.get("target_id")
+            tgt = existing.target_id
             if tgt in self.by_target:
                 self.by_target[tgt].discard(timer_dev.id)
                 if not self.by_target[tgt]:
                     del self.by_target[tgt]
+                    self._dev_cache.pop(tgt, None)
 
     def _reset_timer_states(self, timer_dev: indigo.Device) -> None:
         kv = [{"key": key, "value": 0.0, "uiValue": "0.0", "decimalPlaces": 1} for key, _ in WINDOWS]
@@ -539,50 +1220,50 @@ class Plugin(indigo.PluginBase):
         except Exception:
             pass
 
-    # Add this helper alongside _prune_intervals()
-    def _prune_on_events(self, events: List[datetime], now: datetime) -> None:
+    def _batch_sweep(self, refresh: List[Tuple[indigo.Device, Tracker, Optional[indigo.Device]]], now: datetime) -> Dict[int, List[float]]:
+        """Sweep results for every refreshed timer from one vectorized pass (NumPy engine)."""
+        now_ts = now.timestamp()
+        trackers = [tracker for _, tracker, _ in refresh]
+        rows = [tracker.sweep_boundaries(now) for tracker in trackers]
+        # Window sets differ per device; pad short rows with 'now' (always 0 seconds)
+        width = max(len(row) for row in rows)
+        boundaries = np.full((len(rows), width), now_ts, dtype=np.float64)
+        for i, row in enumerate(rows):
+            boundaries[i, :len(row)] = row
+        totals = _batch_sweep_on_seconds(trackers, boundaries, now_ts)
+        return {timer_dev.id: totals[i, :len(rows[i])].tolist() for i, (timer_dev, _, _) in enumerate(refresh)}
+
+    def _roll_day(self, tracker: Tracker, now: datetime) -> Tuple[float, int]:
         """
-        Keep only ON event timestamps from yesterday midnight forward, since we only
-        need to compute counts for 'yesterday' and 'today'.
+        Close out yesterday for a tracker once now is in a new day: its totals become
+        the yesterday baselines (locked for today) and today's baselines restart at 0.
+        Returns yesterday's (minutes, ON events).
         """
-        try:
-            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            yday_start = today_start - timedelta(days=1)
-            cutoff = yday_start
-            if events:
-                events[:] = [t for t in events if t >= cutoff]
-        except Exception as exc:
-            self.logger.exception(exc)
-
-    def _prune_intervals(self, intervals: List[Tuple[datetime, Optional[datetime]]], now: datetime) -> None:
-        horizon = now - timedelta(seconds=RETENTION_SECONDS)
-        keep: List[Tuple[datetime, Optional[datetime]]] = []
-        for start, end in intervals:
-            effective_end = end or now
-            if effective_end <= horizon:
-                continue
-            keep.append((start, end))
-        if len(keep) != len(intervals):
-            intervals[:] = keep
-
-    def _compute_on_seconds(
-        self,
-        intervals: List[Tuple[datetime, Optional[datetime]]],
-        now: datetime,
-        window_seconds: int
-    ) -> float:
-        window_start = now - timedelta(seconds=window_seconds)
-        total = 0.0
-        for start, end in intervals:
-            s = start
-            e = end or now
-            if e <= window_start or s >= now:
-                continue
-            overlap_start = max(s, window_start)
-            overlap_end = min(e, now)
-            if overlap_end > overlap_start:
-                total += (overlap_end - overlap_start).total_seconds()
-        return total
+        now_ts = now.timestamp()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        today_ts = today_start.timestamp()
+        yday_ts = (today_start - timedelta(days=1)).timestamp()
+
+        # Finished day totals (minutes) = interval sum for yday + baseline 'today'
+        seconds_finished_day = tracker.on_seconds_between(yday_ts, today_ts, now_ts)
+        minutes_finished_day_since = round(seconds_finished_day / 60.0, 1)
+        minutes_finished_day_total = round(
+            minutes_finished_day_since + float(tracker.day_offsets.get("today", 0.0)), 1)
+
+        # Finished day ON event counts = observed in yday + baseline 'today'
+        yday_count_since = tracker.count_on_events(yday_ts, today_ts)
+        yday_count_total = int(
+            yday_count_since + int(tracker.count_offsets.get("today", 0)))
+
+        # Roll baselines: yesterday becomes finished day, reset today's baselines
+        tracker.day_offsets = {"today": 0.0, "yesterday": minutes_finished_day_total}
+        tracker.count_offsets = {"today": 0, "yesterday": yday_count_total}
+        # Lock yesterday for the new day so we don't add interval-based 'since' again
+        tracker.yesterday_locked_for_date = now.date()
+        return minutes_finished_day_total, yday_count_total
+
+    def _yesterday_start(self, now: datetime) -> datetime:
+        return now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
 
     # CHANGE: replace _update_timer_states with offset-aware version
     # REPLACE
@@ -591,24 +1272,40 @@ class Plugin(indigo.PluginBase):
     def _update_timer_states(
             self,
             timer_dev: indigo.Device,
-            tracker: Dict,
-            now: datetime
+            tracker: Tracker,
+            now: datetime,
+            sweep: Optional[List[float]] = None,
+            target_dev: Optional[indigo.Device] = None
     ) -> None:
         """
         Publish rolling window states in minutes (1dp), their text variants,
         and today/yesterday (midnight-anchored). Rolling windows use startup
         offsets; day totals and counts use their own startup baselines.
+        A precomputed sweep (from the NumPy batch) is used as-is when given,
+        and target metadata is included in the same update when target_dev is.
         """
-        intervals: List[Tuple[datetime, Optional[datetime]]] = tracker["intervals"]
-        offsets: Dict[str, float] = tracker.get("offsets", {})
-        day_offsets: Dict[str, float] = tracker.get("day_offsets", {"today": 0.0, "yesterday": 0.0})
-        count_offsets: Dict[str, int] = tracker.get("count_offsets", {"today": 0, "yesterday": 0})
+        offsets = tracker.offsets
+        day_offsets = tracker.day_offsets
+        count_offsets = tracker.count_offsets
 
-        kv_list = []
+        kv_list = self._changed_target_meta_kv(tracker, target_dev) if target_dev else []
+
+        # Rolling windows come from the selected engine; both midnights from one sweep
+        now_ts = now.timestamp()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        today_ts = today_start.timestamp()
+        yday_ts = (today_start - timedelta(days=1)).timestamp()
+        if sweep is None and self.windowEngine == "incremental":
+            window_seconds = tracker.accumulated_on_seconds(now_ts)
+            seconds_today, seconds_since_yday = tracker.sweep_on_seconds([today_ts, yday_ts], now_ts)
+        else:
+            if sweep is None:
+                sweep = tracker.sweep_on_seconds(tracker.sweep_boundaries(now), now_ts)
+            window_seconds = sweep[:-2]
+            seconds_today, seconds_since_yday = sweep[-2], sweep[-1]
 
         # Rolling windows (minutes + text)
-        for state_id, win_secs in WINDOWS:
-            on_seconds = self._compute_on_seconds(intervals, now, win_secs)
+        for (state_id, _), on_seconds in zip(tracker.windows, window_seconds):
             minutes_since_start = round(on_seconds / 60.0, 1)
             total_minutes = round(minutes_since_start + float(offsets.get(state_id, 0.0)), 1)
             kv_list.append(
@@ -616,10 +1313,6 @@ class Plugin(indigo.PluginBase):
             kv_list.append({"key": f"{state_id}_text", "value": self._format_duration_text(total_minutes * 60.0)})
 
         # Day-bounded totals
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        yday_start = today_start - timedelta(days=1)
-
-        seconds_today = self._compute_on_seconds_between(intervals, today_start, now)
         minutes_today = round(seconds_today / 60.0, 1)
         minutes_today_total = round(minutes_today + float(day_offsets.get("today", 0.0)), 1)
         kv_list.append({"key": "timeon_today", "value": minutes_today_total, "uiValue": f"{minutes_today_total:.1f}",
@@ -627,15 +1320,15 @@ class Plugin(indigo.PluginBase):
         kv_list.append({"key": "timeon_today_text", "value": self._format_duration_text(minutes_today_total * 60.0)})
 
         # Today OFF (derived from elapsed day - on)
-        elapsed_today_minutes = round((now - today_start).total_seconds() / 60.0, 1)
+        elapsed_today_minutes = round((now_ts - today_ts) / 60.0, 1)
         off_today_minutes = max(0.0, round(elapsed_today_minutes - minutes_today_total, 1))
         kv_list.append({"key": "timeoff_today", "value": off_today_minutes, "uiValue": f"{off_today_minutes:.1f}",
                         "decimalPlaces": 1})
         kv_list.append({"key": "timeoff_today_text", "value": self._format_duration_text(off_today_minutes * 60.0)})
         # Yesterday ON (minutes + text)
-        seconds_yday = self._compute_on_seconds_between(intervals, yday_start, today_start)
+        seconds_yday = max(0.0, seconds_since_yday - seconds_today)
         minutes_yday = round(seconds_yday / 60.0, 1)
-        y_locked_date = tracker.get("yesterday_locked_for_date")
+        y_locked_date = tracker.yesterday_locked_for_date
         if y_locked_date == now.date():
             minutes_yday_total = float(day_offsets.get("yesterday", 0.0))
         else:
@@ -653,13 +1346,10 @@ class Plugin(indigo.PluginBase):
         kv_list.append({"key": "timeoff_yesterday_text", "value": self._format_duration_text(off_yday_minutes * 60.0)})
 
         # On-event counts
-        on_events = tracker.get("on_events", [])
-        count_today = sum(1 for t in on_events if today_start <= t < now)
-        count_yday = sum(1 for t in on_events if yday_start <= t < today_start)
-
+        count_today = tracker.count_on_events(today_ts, math.inf)
         count_today_total = int(count_today + int(count_offsets.get("today", 0)))
 
-        yday_count_since = sum(1 for t in on_events if yday_start <= t < today_start)
+        yday_count_since = tracker.count_on_events(yday_ts, today_ts)
         if y_locked_date == now.date():
             count_yday_total = int(count_offsets.get("yesterday", 0))
         else:
@@ -667,33 +1357,99 @@ class Plugin(indigo.PluginBase):
         kv_list.append({"key": "oncount_yesterday", "value": count_yday_total, "uiValue": str(count_yday_total)})
         kv_list.append({"key": "oncount_today", "value": count_today_total, "uiValue": str(count_today_total)})
 
+        # Rolling ON-event counts
+        for (state_id, _), count in zip(tracker.count_windows, tracker.window_on_counts(now_ts)):
+            count_total = int(count + int(offsets.get(state_id, 0)))
+            kv_list.append({"key": state_id, "value": count_total, "uiValue": str(count_total)})
+
         try:
-            timer_dev.updateStatesOnServer(kv_list)
-            self.logger.debug(
-                f"Updated timers (minutes) for '{timer_dev.name}': " +
-                ", ".join([f"{kv['key']}={kv.get('uiValue', kv.get('value'))}" for kv in kv_list if
-                           kv['key'].startswith('timeon_') and not kv['key'].endswith('_text')])
-            )
+            changed = self._publish_states(timer_dev, kv_list)
+            if changed:
+                self.logger.debug(
+                    f"Updated timers (minutes) for '{timer_dev.name}': " +
+                    ", ".join([f"{kv['key']}={kv.get('uiValue', kv.get('value'))}" for kv in changed if
+                               kv['key'].startswith('timeon_') and not kv['key'].endswith('_text')])
+                )
         except Exception as exc:
             self.logger.exception(exc)
 
-    def _update_target_meta_states(self, timer_dev: indigo.Device, target_dev: Optional[indigo.Device]) -> None:
+    def _publish_states(self, timer_dev: indigo.Device, kv_list: List[Dict]) -> List[Dict]:
+        """
+        Queue the states whose value or uiValue differs from what this plugin last
+        published for the device; the writer thread sends them to the server.
+        Returns the key/value dicts that were queued.
+        """
+        published = self._published_states.setdefault(timer_dev.id, {})
+        changed = [kv for kv in kv_list if published.get(kv["key"]) != (kv["value"], kv.get("uiValue"))]
+        if changed:
+            for kv in changed:
+                published[kv["key"]] = (kv["value"], kv.get("uiValue"))
+            with self._pending_cv:
+                _, pending = self._pending_states.setdefault(timer_dev.id, (timer_dev, {}))
+                # Latest value wins for a key queued more than once before a flush
+                for kv in changed:
+                    pending[kv["key"]] = kv
+                self._pending_cv.notify()
+        return changed
+
+    def _state_writer_loop(self) -> None:
+        """Writer thread: wait for queued states, let a burst settle, then flush."""
+        self.logger.debug("State writer thread started")
+        while True:
+            with self._pending_cv:
+                while not self._pending_states and not self._writer_stop:
+                    self._pending_cv.wait()
+                if self._writer_stop:
+                    break
+            time.sleep(STATE_WRITE_COALESCE_SECS)
+            self._flush_pending_states()
+        self.logger.debug("State writer thread stopped")
+
+    def _flush_pending_states(self) -> None:
+        """Send every queued device's merged states in one updateStatesOnServer call each."""
+        with self._pending_cv:
+            pending, self._pending_states = self._pending_states, {}
+        for timer_dev, states in pending.values():
+            try:
+                timer_dev.updateStatesOnServer(list(states.values()))
+            except Exception as exc:
+                self.logger.exception(exc)
+                # Nothing reached the server: forget these as published so the next refresh resends them
+                published = self._published_states.get(timer_dev.id, {})
+                for key in states:
+                    published.pop(key, None)
+                tracker = self.trackers.get(timer_dev.id)
+                if tracker and any(key.startswith("target_") for key in states):
+                    tracker.meta_signature = None
+
+    def _target_meta_kv(self, target_dev: Optional[indigo.Device]) -> List[Dict]:
         if target_dev:
             on_val = getattr(target_dev, "onState", False)
-            kv = [
+            return [
                 {"key": "target_device_id", "value": int(target_dev.id)},
                 {"key": "target_device_name", "value": target_dev.name},
                 {"key": "target_on_state", "value": bool(on_val) if on_val is not None else False},
             ]
-        else:
-            kv = [
-                {"key": "target_device_id", "value": 0},
-                {"key": "target_device_name", "value": "--"},
-                {"key": "target_on_state", "value": False},
-            ]
+        return [
+            {"key": "target_device_id", "value": 0},
+            {"key": "target_device_name", "value": "--"},
+            {"key": "target_on_state", "value": False},
+        ]
+
+    def _changed_target_meta_kv(self, tracker: Tracker, target_dev: indigo.Device) -> List[Dict]:
+        """Target metadata key/values, or nothing when id, name and onState are as last published."""
+        signature = (target_dev.id, target_dev.name, bool(getattr(target_dev, "onState", False)))
+        if signature == tracker.meta_signature:
+            return []
+        tracker.meta_signature = signature
+        return self._target_meta_kv(target_dev)
+
+    def _update_target_meta_states(self, timer_dev: indigo.Device, target_dev: Optional[indigo.Device]) -> None:
+        kv = self._target_meta_kv(target_dev)
         try:
-            timer_dev.updateStatesOnServer(kv)
-            self.logger.debug(f"Meta updated for '{timer_dev.name}': " + ", ".join([f"{d['key']}={d['value']}" for d in kv]))
+            changed = self._publish_states(timer_dev, kv)
+            if changed:
+                self.logger.debug(f"Meta updated for '{timer_dev.name}': " + ", ".join([f"{d['key']}={d['value']}" for d in changed]))
         except Exception as exc:
             self.logger.exception(exc)
 
@@ -708,6 +1464,17 @@ class Plugin(indigo.PluginBase):
         target = values_dict.get("targetDeviceId", "")
         if not target:
             errors["targetDeviceId"] = "Please select a device to track."
+        try:
+            windows = parse_window_spec(values_dict.get("windows", "") or DEFAULT_WINDOW_SPEC)
+            values_dict["windows"] = ", ".join(window_labels(state_id)[1] for state_id, _ in windows)
+        except ValueError as exc:
+            errors["windows"] = f"Invalid window list: {exc}."
+        for key in ("debounceSeconds", "minOnSeconds"):
+            try:
+                if float(values_dict.get(key, 0) or 0) < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                errors[key] = "Please enter a number of seconds (0 or more)."
         if errors:
             return (False, errors, values_dict)
         return (True, values_dict)
\ No newline at end of file
@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+####################
+# Device Timer plugin: reader for Indigo's SQL Logger (SQLite) device history
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+SQL_LOGGER_ON_COLUMN: str = "onoffstate"
+# Tables read per query: SQLite allows at most 500 terms in a compound SELECT
+SQL_LOGGER_TABLES_PER_QUERY: int = 500
+
+
+def read_state_changes(db_path: str, device_ids: List[int], since_ts: float) -> Dict[int, Tuple[float, List[Tuple[float, bool]]]]:
+    """
+    (coverage start, ON/OFF changes) per device from an SQL Logger database, from
+    the last logged row before since_ts onwards.
+
+    Tables are found with one catalog query and read with one UNION ALL query per
+    SQL_LOGGER_TABLES_PER_QUERY tables. A device's changes start with its first
+    row and then hold only the rows where onoffstate changes, oldest first. The
+    coverage start is the time of that first row: from then on the device's ON/OFF
+    state is known. Devices without a logged row are left out.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        wanted = {f"device_history_{dev_id}": dev_id for dev_id in device_ids}
+        tables = [
+            name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'device_history_%' AND sql LIKE ?",
+                (f"%{SQL_LOGGER_ON_COLUMN}%",),
+            )
+            if name in wanted
+        ]
+        if not tables:
+            return {}
+        since = datetime.fromtimestamp(since_ts).strftime("%Y-%m-%d %H:%M:%S")
+        rows = []
+        for first in range(0, len(tables), SQL_LOGGER_TABLES_PER_QUERY):
+            chunk = tables[first:first + SQL_LOGGER_TABLES_PER_QUERY]
+            query = " UNION ALL ".join(
+                f"SELECT {wanted[table]}, ts, {SQL_LOGGER_ON_COLUMN} FROM {table} "
+                f"WHERE {SQL_LOGGER_ON_COLUMN} IS NOT NULL AND ts >= "
+                f"(SELECT COALESCE(MAX(ts), '') FROM {table} WHERE ts < ? AND {SQL_LOGGER_ON_COLUMN} IS NOT NULL)"
+                for table in chunk
+            )
+            # Each chunk is ordered by device, and a device's rows are all in one chunk
+            rows.extend(conn.execute(query + " ORDER BY 1, 2", [since] * len(chunk)).fetchall())
+    finally:
+        conn.close()
+
+    history: Dict[int, Tuple[float, List[Tuple[float, bool]]]] = {}
+    for dev_id, ts, on_value in rows:
+        on = bool(on_value)
+        epoch = datetime.fromisoformat(str(ts)).timestamp()
+        if dev_id not in history:
+            history[dev_id] = (epoch, [(epoch, on)])
+            continue
+        changes = history[dev_id][1]
+        if changes[-1][1] != on:
+            changes.append((epoch, on))
+    return history
@@ -0,0 +1,394 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+####################
+# Device Timer plugin: per-timer interval history and display baselines
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Default rolling windows in seconds mapped to state ids (devices may configure their own)
+WINDOWS: List[Tuple[str, int]] = [
+    ("timeon_24hours", 24 * 3600),
+    ("timeon_48hours", 48 * 3600),
+    ("timeon_72hours", 72 * 3600),
+    ("timeon_96hours", 96 * 3600),
+    ("timeon_5days", 5 * 24 * 3600),
+    ("timeon_6days", 6 * 24 * 3600),
+    ("timeon_1week", 7 * 24 * 3600),
+    ("timeon_2weeks", 14 * 24 * 3600),
+    ("timeon_3weeks", 21 * 24 * 3600),
+]
+
+# Intervals and ON events are held as epoch seconds; datetimes only appear at the edges
+# (day boundaries and logging). Interval ends use OPEN_END while the interval is open,
+# which keeps the ends column sorted so it can be binary searched directly.
+OPEN_END: float = math.inf
+# Expired head entries are compacted away once they are at least this many and at
+# least half of the stored intervals, so each entry is moved O(1) times on average
+COMPACT_MIN_EXPIRED: int = 64
+
+# Persisted transition kinds: an OFF, an OFF->ON (opens an interval and counts an ON
+# event, or resumes a debounced one) and an interval opened without an ON event
+# (target found ON at startup or on a refresh)
+TRANSITION_OFF: int = 0
+TRANSITION_ON: int = 1
+TRANSITION_OPEN: int = 2
+
+
+def count_state_id(window_state_id: str) -> str:
+    """ON-event count state id for a rolling window state id (timeon_24hours -> oncount_24hours)."""
+    return "oncount" + window_state_id[len("timeon"):]
+
+
+class Tracker:
+    """
+    Interval history, prefix index and display baselines for one timer device.
+
+    Intervals are held as parallel 'starts'/'ends' array('d') columns of epoch
+    seconds (ends use OPEN_END while open); cum_on[i] is the closed ON seconds in
+    intervals [0, i), so it always has one more entry than the columns. The columns
+    behave as a ring: entries before 'head' have expired and are skipped until the
+    next compaction.
+    """
+
+    __slots__ = (
+        "target_id",
+        "windows",
+        "count_windows",
+        "retention_seconds",
+        "starts",
+        "ends",
+        "cum_on",
+        "head",
+        "window_acc",
+        "on_events",
+        "events_head",
+        "offsets",
+        "day_offsets",
+        "count_offsets",
+        "yesterday_locked_for_date",
+        "covered_since",
+        "debounce_seconds",
+        "min_on_seconds",
+        "last_transition_ts",
+        "meta_signature",
+    )
+
+    def __init__(
+        self,
+        target_id: Optional[int] = None,
+        offsets: Optional[Dict[str, float]] = None,
+        day_offsets: Optional[Dict[str, float]] = None,
+        count_offsets: Optional[Dict[str, int]] = None,
+        yesterday_locked_for_date: Optional[date] = None,
+        windows: Optional[List[Tuple[str, int]]] = None,
+        debounce_seconds: float = 0.0,
+        min_on_seconds: float = 0.0,
+    ) -> None:
+        self.target_id: Optional[int] = target_id
+        # Rolling windows (shortest first) and their ON-count states; history is
+        # only kept as long as the longest window needs it
+        self.windows: List[Tuple[str, int]] = windows if windows is not None else WINDOWS
+        self.count_windows: List[Tuple[str, int]] = [(count_state_id(state_id), secs) for state_id, secs in self.windows]
+        self.retention_seconds: int = self.windows[-1][1]
+        self.starts = array("d")
+        self.ends = array("d")
+        self.cum_on = array("d", [0.0])
+        self.head = 0
+        # Running totals for the incremental engine: state_id -> [cursor, closed_seconds]
+        self.window_acc: Dict[str, List] = {state_id: [0, 0.0] for state_id, _ in self.windows}
+        # Epoch seconds of OFF->ON transitions, in time order; entries before
+        # events_head have expired (same ring scheme as the interval columns)
+        self.on_events = array("d")
+        self.events_head = 0
+        # Snapshot at startup to preserve displayed values, keyed by state id
+        # (minutes for timeon_* windows, counts for oncount_* windows)
+        self.offsets: Dict[str, float] = offsets if offsets is not None else {}
+        self.day_offsets: Dict[str, float] = day_offsets if day_offsets is not None else {"today": 0.0, "yesterday": 0.0}
+        self.count_offsets: Dict[str, int] = count_offsets if count_offsets is not None else {"today": 0, "yesterday": 0}
+        self.yesterday_locked_for_date: Optional[date] = yesterday_locked_for_date
+        # Epoch seconds from which the intervals are complete; baselines only stand in
+        # for time before it
+        self.covered_since: float = math.inf
+        # Chatter handling: an OFF->ON gap shorter than debounce_seconds continues the
+        # previous interval, and intervals shorter than min_on_seconds are dropped
+        self.debounce_seconds: float = debounce_seconds
+        self.min_on_seconds: float = min_on_seconds
+        self.last_transition_ts: float = -math.inf
+        # (id, name, onState) of the target as last published in the metadata states
+        self.meta_signature: Optional[Tuple[int, str, bool]] = None
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self.ends) and self.ends[-1] == OPEN_END
+
+    @property
+    def interval_count(self) -> int:
+        return len(self.ends) - self.head
+
+    def open_interval(self, ts: float) -> bool:
+        """Append an open interval starting at ts unless one is already open."""
+        if self.is_open:
+            return False
+        self.starts.append(ts)
+        self.ends.append(OPEN_END)
+        self.cum_on.append(self.cum_on[-1])
+        return True
+
+    def resume_interval(self, ts: float) -> bool:
+        """
+        Reopen the last interval if it closed less than debounce_seconds before ts,
+        taking its duration back out of the prefix index and window totals.
+        """
+        if self.is_open or len(self.ends) <= self.head or ts - self.ends[-1] >= self.debounce_seconds:
+            return False
+        last = len(self.ends) - 1
+        duration = self.cum_on[-1] - self.cum_on[-2]
+        self.ends[-1] = OPEN_END
+        self.cum_on[-1] = self.cum_on[-2]
+        for acc in self.window_acc.values():
+            if acc[0] <= last:
+                acc[1] -= duration
+            else:
+                # The cursor had already moved past (and subtracted) this interval
+                acc[0] = last
+        return True
+
+    def record_on_event(self, ts: float) -> None:
+        self.on_events.append(ts)
+
+    def close_interval(self, ts: float) -> bool:
+        """
+        Close the open interval (if any) at ts and fold it into the prefix index.
+        An interval shorter than min_on_seconds is dropped along with its ON event.
+        """
+        if not self.is_open:
+            return False
+        duration = max(0.0, ts - self.starts[-1])
+        if duration < self.min_on_seconds:
+            start = self.starts.pop()
+            self.ends.pop()
+            self.cum_on.pop()
+            if len(self.on_events) > self.events_head and self.on_events[-1] == start:
+                self.on_events.pop()
+            return True
+        self.ends[-1] = ts
+        self.cum_on[-1] = self.cum_on[-2] + duration
+        # The closed interval is newer than every window cursor, so it counts in full
+        for acc in self.window_acc.values():
+            acc[1] += duration
+        return True
+
+    def prune(self, now_ts: float, keep_from_ts: float) -> None:
+        """
+        Drop intervals and ON events older than both the longest window and
+        keep_from_ts (yesterday's midnight, for the day totals). Both are kept in
+        time order, so expired entries are always at the head: pruning only moves
+        the head cursors past them, and nothing is touched when nothing has expired.
+        """
+        horizon = min(now_ts - self.retention_seconds, keep_from_ts)
+        expired = bisect_right(self.ends, horizon, self.head)
+        if expired > self.head:
+            # Every window is no longer than the horizon, so once advanced no
+            # cursor points into the expired head
+            self.advance_windows(now_ts)
+            self.head = expired
+            if expired >= COMPACT_MIN_EXPIRED and expired * 2 >= len(self.ends):
+                self._compact()
+        events_expired = bisect_left(self.on_events, horizon, self.events_head)
+        if events_expired > self.events_head:
+            self.events_head = events_expired
+            if events_expired >= COMPACT_MIN_EXPIRED and events_expired * 2 >= len(self.on_events):
+                del self.on_events[:events_expired]
+                self.events_head = 0
+
+    def _compact(self) -> None:
+        # The prefix index stays valid with its head removed, since sums are differences
+        expired = self.head
+        del self.starts[:expired]
+        del self.ends[:expired]
+        del self.cum_on[:expired]
+        for acc in self.window_acc.values():
+            acc[0] = max(0, acc[0] - expired)
+        self.head = 0
+
+    def advance_windows(self, now_ts: float) -> None:
+        """
+        Move each window's cursor past closed intervals that have ended at or before
+        the window start, subtracting them from its running total. Cursors only ever
+        move forward, so the cost per refresh is amortized O(1) per window.
+        """
+        ends = self.ends
+        cum_on = self.cum_on
+        n = len(ends)
+        for state_id, win_secs in self.windows:
+            acc = self.window_acc[state_id]
+            cursor = max(acc[0], self.head)
+            window_start = now_ts - win_secs
+            # OPEN_END never satisfies the test, so the open interval stops the cursor
+            while cursor < n and ends[cursor] <= window_start:
+                cursor += 1
+            if cursor != acc[0]:
+                acc[1] -= cum_on[cursor] - cum_on[acc[0]]
+                acc[0] = cursor
+
+    def accumulated_on_seconds(self, now_ts: float) -> List[float]:
+        """ON seconds per rolling window from the running totals (incremental engine)."""
+        self.advance_windows(now_ts)
+        starts = self.starts
+        ends = self.ends
+        n = len(ends)
+        open_start = starts[-1] if self.is_open else None
+        results = []
+        for state_id, win_secs in self.windows:
+            cursor, total = self.window_acc[state_id]
+            window_start = now_ts - win_secs
+            if cursor < n and ends[cursor] != OPEN_END and starts[cursor] < window_start:
+                total -= window_start - starts[cursor]
+            if open_start is not None:
+                total += max(0.0, now_ts - max(open_start, window_start))
+            results.append(total)
+        return results
+
+    def sweep_on_seconds(self, boundaries: List[float], now_ts: float) -> List[float]:
+        """
+        ON seconds within [boundary, now] for every boundary in a single sweep.
+
+        Boundaries are visited newest to oldest; each one needs a binary search for
+        the first interval ending after it (bounded by the previous hit, since older
+        boundaries can only move left), a head correction if that interval straddles
+        the boundary, and the shared tail correction for the open interval.
+        """
+        starts = self.starts
+        ends = self.ends
+        cum_on = self.cum_on
+        n = len(ends)
+        open_start = starts[-1] if self.is_open else None
+        closed_total = cum_on[n]
+
+        results = [0.0] * len(boundaries)
+        hi = n
+        for idx in sorted(range(len(boundaries)), key=boundaries.__getitem__, reverse=True):
+            since = boundaries[idx]
+            first = bisect_right(ends, since, self.head, hi)
+            hi = first
+            total = closed_total - cum_on[first]
+            if first < n and ends[first] != OPEN_END and starts[first] < since:
+                total -= since - starts[first]
+            if open_start is not None:
+                total += max(0.0, now_ts - max(open_start, since))
+            results[idx] = total
+        return results
+
+    def count_on_events(self, start_ts: float, end_ts: float) -> int:
+        """Number of ON events in [start_ts, end_ts)."""
+        return bisect_left(self.on_events, end_ts, self.events_head) - bisect_left(self.on_events, start_ts, self.events_head)
+
+    def window_on_counts(self, now_ts: float) -> List[int]:
+        """Number of ON events in [now - window, now] per rolling window."""
+        newest = bisect_right(self.on_events, now_ts, self.events_head)
+        return [newest - bisect_left(self.on_events, now_ts - secs, self.events_head, newest) for _, secs in self.windows]
+
+    def on_seconds_between(self, start_ts: float, end_ts: float, now_ts: float) -> float:
+        # [start, end] = [start, now] - [end, now]; end_ts must not be after now
+        since_start, since_end = self.sweep_on_seconds([start_ts, end_ts], now_ts)
+        return max(0.0, since_start - since_end)
+
+    def replay(self, transitions: List[Tuple[float, int]]) -> None:
+        """Apply persisted (ts, kind) transitions, oldest first, as they were applied live."""
+        for ts, kind in transitions:
+            if kind == TRANSITION_OFF:
+                self.close_interval(ts)
+            elif kind == TRANSITION_ON:
+                if not self.resume_interval(ts) and self.open_interval(ts):
+                    self.record_on_event(ts)
+            else:
+                self.open_interval(ts)
+
+    def restore(self, snapshot: Dict) -> None:
+        """Load intervals, ON events and baselines from a snapshot() of this timer."""
+        # Saved intervals were already filtered when they closed
+        min_on_seconds, self.min_on_seconds = self.min_on_seconds, 0.0
+        for start, end in snapshot.get("intervals", []):
+            self.open_interval(start)
+            if end is not None:
+                self.close_interval(end)
+        self.min_on_seconds = min_on_seconds
+        self.on_events = array("d", snapshot.get("on_events", []))
+        self.offsets = dict(snapshot.get("offsets", {}))
+        self.day_offsets = dict(snapshot.get("day_offsets", self.day_offsets))
+        self.count_offsets = dict(snapshot.get("count_offsets", self.count_offsets))
+        locked = snapshot.get("yesterday_locked_for_date")
+        self.yesterday_locked_for_date = date.fromisoformat(locked) if isinstance(locked, str) else locked
+        self.covered_since = float(snapshot.get("covered_since", math.inf))
+
+    def sweep_boundaries(self, now: datetime) -> List[float]:
+        """Every rolling window start followed by today's and yesterday's midnights."""
+        now_ts = now.timestamp()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        boundaries = [now_ts - win_secs for _, win_secs in self.windows]
+        boundaries.extend((today_start.timestamp(), (today_start - timedelta(days=1)).timestamp()))
+        return boundaries
+
+    def reconcile_baselines(self, since: float, now: datetime) -> None:
+        """
+        Cut the startup baselines down to whatever part of each window the rebuilt
+        intervals (known from 'since' onwards) do not cover: nothing, once they are
+        older than the window.
+        """
+        now_ts = now.timestamp()
+        today_ts = now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        self.covered_since = since
+        sweep = self.sweep_on_seconds(self.sweep_boundaries(now), now_ts)
+        counts = self.window_on_counts(now_ts)
+        for (state_id, win_secs), on_seconds, (count_id, _), count in zip(self.windows, sweep, self.count_windows, counts):
+            if since > now_ts - win_secs:
+                self.offsets[state_id] = max(0.0, round(float(self.offsets.get(state_id, 0.0)) - on_seconds / 60.0, 1))
+                self.offsets[count_id] = max(0, int(self.offsets.get(count_id, 0)) - count)
+        if since > today_ts:
+            self.day_offsets["today"] = max(0.0, round(self.day_offsets["today"] - sweep[-2] / 60.0, 1))
+            self.count_offsets["today"] = max(0, self.count_offsets["today"] - self.count_on_events(today_ts, math.inf))
+        self.expire_baselines(now)
+
+    def expire_baselines(self, now: datetime) -> None:
+        """Zero the baselines of every window (and day) that lies wholly after covered_since."""
+        now_ts = now.timestamp()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        since = self.covered_since
+        for (state_id, win_secs), (count_id, _) in zip(self.windows, self.count_windows):
+            if since <= now_ts - win_secs:
+                self.offsets[state_id] = 0.0
+                self.offsets[count_id] = 0
+        if since <= today_start.timestamp():
+            self.day_offsets["today"] = 0.0
+            self.count_offsets["today"] = 0
+        if since <= (today_start - timedelta(days=1)).timestamp():
+            # Yesterday is fully in the history, so it no longer needs the frozen snapshot
+            self.day_offsets["yesterday"] = 0.0
+            self.count_offsets["yesterday"] = 0
+            self.yesterday_locked_for_date = None
+
+    def reset_baselines(self) -> None:
+        self.offsets = {}
+        self.day_offsets = {"today": 0.0, "yesterday": 0.0}
+        self.count_offsets = {"today": 0, "yesterday": 0}
+
+    def snapshot(self) -> Dict:
+        """Plain-data copy of the tracker, for logging and persistence."""
+        return {
+            "target_id": self.target_id,
+            "windows": list(self.windows),
+            "intervals": [
+                (s, None if e == OPEN_END else e)
+                for s, e in zip(self.starts[self.head:], self.ends[self.head:])
+            ],
+            "on_events": self.on_events[self.events_head:].tolist(),
+            "offsets": dict(self.offsets),
+            "day_offsets": dict(self.day_offsets),
+            "count_offsets": dict(self.count_offsets),
+            "yesterday_locked_for_date": self.yesterday_locked_for_date,
+            "covered_since": self.covered_since,
+        }
+
@@ -0,0 +1,188 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "devicetimer.indigoPlugin", "Contents", "Server Plugin"))
+
+from history import JOURNAL_RECORD, HistoryStore, JournalStore  # noqa: E402
+from tracker import TRANSITION_OFF, TRANSITION_ON, TRANSITION_OPEN, Tracker  # noqa: E402
+
+
+class HistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "history.sqlite")
+        self.store = HistoryStore(self.db_path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _reopen(self):
+        self.store.close()
+        self.store = HistoryStore(self.db_path)
+
+    def test_history_starts_at_first_load_and_survives_reopen(self):
+        self.assertEqual(self.store.load(20, 0.0, 1000.0), (1000.0, []))
+        self.store.record(20, 1100.0, TRANSITION_ON)
+        self._reopen()
+        self.assertEqual(self.store.load(20, 0.0, 5000.0), (1000.0, [(1100.0, TRANSITION_ON)]))
+
+    def test_load_starts_from_the_last_transition_before_the_horizon(self):
+        self.store.load(20, 0.0, 0.0)
+        for ts, kind in ((100.0, TRANSITION_ON), (200.0, TRANSITION_OFF), (300.0, TRANSITION_ON), (400.0, TRANSITION_OFF)):
+            self.store.record(20, ts, kind)
+        self.store.record(21, 250.0, TRANSITION_ON)
+        _, transitions = self.store.load(20, 350.0, 500.0)
+        self.assertEqual(transitions, [(300.0, TRANSITION_ON), (400.0, TRANSITION_OFF)])
+
+    def test_prune_keeps_the_last_transition_before_the_horizon(self):
+        self.store.load(20, 0.0, 0.0)
+        for ts, kind in ((100.0, TRANSITION_ON), (200.0, TRANSITION_OFF), (300.0, TRANSITION_ON)):
+            self.store.record(20, ts, kind)
+        self.store.flush()
+        self.store.prune(20, 250.0)
+        self.assertEqual(self.store.load(20, 0.0, 500.0)[1], [(200.0, TRANSITION_OFF), (300.0, TRANSITION_ON)])
+
+    def test_forget_restarts_the_history(self):
+        self.store.load(20, 0.0, 100.0)
+        self.store.record(20, 150.0, TRANSITION_ON)
+        self.store.forget(20)
+        self.assertEqual(self.store.load(20, 0.0, 900.0), (900.0, []))
+
+
+class JournalStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.tmp.name, "history.journal")
+        self.store = JournalStore(self.journal_path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _reopen(self):
+        self.store.close()
+        self.store = JournalStore(self.journal_path)
+
+    def test_transitions_survive_reopen(self):
+        self.store.load(20, 0.0, 50.0)
+        self.store.record(20, 100.0, TRANSITION_ON)
+        self.store.record(20, 200.0, TRANSITION_OFF)
+        self._reopen()
+        self.assertEqual(self.store.load(20, 0.0, 300.0), (50.0, [(100.0, TRANSITION_ON), (200.0, TRANSITION_OFF)]))
+
+    def test_torn_tail_is_cut_off_before_appending(self):
+        self.store.load(20, 0.0, 50.0)
+        self.store.record(20, 100.0, TRANSITION_ON)
+        self.store.close()
+        with open(self.journal_path, "ab") as fh:
+            fh.write(b"\x01\x02")
+        self.store = JournalStore(self.journal_path)
+        self.assertEqual(os.path.getsize(self.journal_path) % JOURNAL_RECORD.size, 0)
+        self.store.record(20, 200.0, TRANSITION_OFF)
+        self._reopen()
+        self.assertEqual(self.store.load(20, 0.0, 300.0), (50.0, [(100.0, TRANSITION_ON), (200.0, TRANSITION_OFF)]))
+        self.assertEqual(set(self.store._transitions), {20})
+
+    def test_compaction_drops_pruned_records_from_the_file(self):
+        self.store.load(20, 0.0, 0.0)
+        self.store.load(21, 0.0, 0.0)
+        for i in range(100):
+            self.store.record(20, float(i), TRANSITION_ON if i % 2 == 0 else TRANSITION_OFF)
+        self.store.record(21, 5.0, TRANSITION_OPEN)
+        self.store.flush()
+        self.store.prune(20, 90.0)
+        self.store.compact()
+        # Two history starts, transitions 89..99 of timer 20 and one of timer 21
+        self.assertEqual(os.path.getsize(self.journal_path), (2 + 11 + 1) * JOURNAL_RECORD.size)
+        self.store.record(20, 150.0, TRANSITION_OFF)
+        self._reopen()
+        _, transitions = self.store.load(20, 0.0, 200.0)
+        self.assertEqual(transitions[0], (89.0, TRANSITION_OFF))
+        self.assertEqual(transitions[-1], (150.0, TRANSITION_OFF))
+        self.assertEqual(len(transitions), 12)
+        self.assertEqual(self.store.load(21, 0.0, 200.0), (0.0, [(5.0, TRANSITION_OPEN)]))
+
+    def test_forget_is_compacted_away(self):
+        self.store.load(20, 0.0, 10.0)
+        self.store.record(20, 100.0, TRANSITION_ON)
+        self.store.forget(20)
+        self.store.compact()
+        self._reopen()
+        self.assertEqual(self.store.load(20, 0.0, 500.0), (500.0, []))
+
+
+class TrackerTest(unittest.TestCase):
+    WINDOWS = [("timeon_1hour", 3600), ("timeon_24hours", 24 * 3600)]
+
+    def setUp(self):
+        self.now = datetime(2026, 3, 10, 12, 0, 0)
+        self.now_ts = self.now.timestamp()
+
+    def _tracker(self, **kwargs):
+        return Tracker(target_id=10, windows=self.WINDOWS, **kwargs)
+
+    def _ago(self, **delta):
+        return (self.now - timedelta(**delta)).timestamp()
+
+    def test_replay_builds_intervals_and_on_events(self):
+        tracker = self._tracker()
+        tracker.replay([
+            (self._ago(hours=5), TRANSITION_OPEN),
+            (self._ago(hours=4), TRANSITION_OFF),
+            (self._ago(minutes=30), TRANSITION_ON),
+        ])
+        self.assertEqual(tracker.interval_count, 2)
+        self.assertTrue(tracker.is_open)
+        self.assertEqual(tracker.sweep_on_seconds([self._ago(hours=1), self._ago(hours=24)], self.now_ts), [1800.0, 5400.0])
+        # An interval opened without an ON event (target found ON) is not counted
+        self.assertEqual(tracker.window_on_counts(self.now_ts), [1, 1])
+
+    def test_restore_round_trips_a_snapshot(self):
+        tracker = self._tracker(offsets={"timeon_24hours": 12.5}, day_offsets={"today": 3.0, "yesterday": 40.0})
+        tracker.replay([(self._ago(hours=3), TRANSITION_ON), (self._ago(hours=2), TRANSITION_OFF), (self._ago(minutes=10), TRANSITION_ON)])
+        tracker.covered_since = self._ago(hours=6)
+        restored = self._tracker()
+        restored.restore(tracker.snapshot())
+        self.assertEqual(restored.snapshot(), tracker.snapshot())
+        self.assertEqual(
+            restored.sweep_on_seconds(restored.sweep_boundaries(self.now), self.now_ts),
+            tracker.sweep_on_seconds(tracker.sweep_boundaries(self.now), self.now_ts),
+        )
+
+    def test_reconcile_subtracts_partly_covered_windows(self):
+        tracker = self._tracker(offsets={"timeon_1hour": 50.0, "timeon_24hours": 300.0, "oncount_24hours": 4})
+        tracker.replay([(self._ago(hours=2), TRANSITION_ON), (self._ago(hours=1, minutes=30), TRANSITION_OFF)])
+        tracker.reconcile_baselines(self._ago(hours=3), self.now)
+        # The 1h window lies wholly after the history start; 24h loses the 30 restored minutes and one ON event
+        self.assertEqual(tracker.offsets["timeon_1hour"], 0.0)
+        self.assertEqual(tracker.offsets["timeon_24hours"], 270.0)
+        self.assertEqual(tracker.offsets["oncount_24hours"], 3)
+        self.assertEqual(tracker.covered_since, self._ago(hours=3))
+
+    def test_reconcile_zeroes_fully_covered_days(self):
+        tracker = self._tracker(
+            offsets={"timeon_24hours": 300.0},
+            day_offsets={"today": 100.0, "yesterday": 200.0},
+            count_offsets={"today": 2, "yesterday": 5},
+            yesterday_locked_for_date=self.now.date(),
+        )
+        tracker.reconcile_baselines(self._ago(days=3), self.now)
+        self.assertEqual(tracker.offsets["timeon_24hours"], 0.0)
+        self.assertEqual(tracker.day_offsets, {"today": 0.0, "yesterday": 0.0})
+        self.assertEqual(tracker.count_offsets, {"today": 0, "yesterday": 0})
+        self.assertIsNone(tracker.yesterday_locked_for_date)
+
+    def test_expire_leaves_baselines_the_history_does_not_cover(self):
+        tracker = self._tracker(offsets={"timeon_1hour": 20.0, "timeon_24hours": 300.0}, day_offsets={"today": 100.0, "yesterday": 200.0})
+        tracker.covered_since = self._ago(hours=2)
+        tracker.expire_baselines(self.now)
+        self.assertEqual(tracker.offsets, {"timeon_1hour": 0.0, "oncount_1hour": 0, "timeon_24hours": 300.0})
+        self.assertEqual(tracker.day_offsets, {"today": 100.0, "yesterday": 200.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
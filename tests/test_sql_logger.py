@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "devicetimer.indigoPlugin", "Contents", "Server Plugin"))
+
+from sql_logger import read_state_changes  # noqa: E402
+
+
+class ReadStateChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "indigo_history.sqlite")
+        self.now = datetime.now().replace(microsecond=0)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE device_history_100 (id INTEGER PRIMARY KEY, ts TIMESTAMP, onoffstate BOOL, brightnesslevel INTEGER)")
+        conn.execute("CREATE TABLE device_history_101 (id INTEGER PRIMARY KEY, ts TIMESTAMP, onoffstate BOOL)")
+        conn.execute("CREATE TABLE device_history_102 (id INTEGER PRIMARY KEY, ts TIMESTAMP, onoffstate BOOL)")
+        conn.execute("CREATE TABLE device_history_555 (id INTEGER PRIMARY KEY, ts TIMESTAMP, temperature REAL)")
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _log(self, dev_id, ago, on, **columns):
+        conn = sqlite3.connect(self.db_path)
+        names = ", ".join(["ts", "onoffstate"] + list(columns))
+        marks = ", ".join("?" * (2 + len(columns)))
+        ts = (self.now - ago).strftime("%Y-%m-%d %H:%M:%S")
+        conn.execute(f"INSERT INTO device_history_{dev_id} ({names}) VALUES ({marks})", [ts, on] + list(columns.values()))
+        conn.commit()
+        conn.close()
+
+    def _read(self, device_ids, horizon=timedelta(days=7)):
+        return read_state_changes(self.db_path, device_ids, (self.now - horizon).timestamp())
+
+    def _ts(self, ago):
+        return (self.now - ago).timestamp()
+
+    def test_leading_off_row_sets_coverage(self):
+        self._log(100, timedelta(days=10), False)
+        self._log(100, timedelta(hours=1), True)
+        covered_since, changes = self._read([100])[100]
+        self.assertEqual(covered_since, self._ts(timedelta(days=10)))
+        self.assertEqual(changes, [(self._ts(timedelta(days=10)), False), (self._ts(timedelta(hours=1)), True)])
+
+    def test_always_off_device_still_reports_coverage(self):
+        self._log(101, timedelta(days=10), False)
+        self.assertEqual(self._read([101]), {101: (self._ts(timedelta(days=10)), [(self._ts(timedelta(days=10)), False)])})
+
+    def test_rows_without_a_state_change_are_dropped(self):
+        self._log(100, timedelta(hours=5), True, brightnesslevel=40)
+        self._log(100, timedelta(hours=4), True, brightnesslevel=80)
+        self._log(100, timedelta(hours=3), False, brightnesslevel=0)
+        self._log(100, timedelta(hours=2), False, brightnesslevel=0)
+        _, changes = self._read([100])[100]
+        self.assertEqual(changes, [(self._ts(timedelta(hours=5)), True), (self._ts(timedelta(hours=3)), False)])
+
+    def test_only_the_last_row_before_the_horizon_is_read(self):
+        self._log(102, timedelta(days=20), True)
+        self._log(102, timedelta(days=9), False)
+        self._log(102, timedelta(days=1), True)
+        covered_since, changes = self._read([102])[102]
+        self.assertEqual(covered_since, self._ts(timedelta(days=9)))
+        self.assertEqual(changes, [(self._ts(timedelta(days=9)), False), (self._ts(timedelta(days=1)), True)])
+
+    def test_devices_without_rows_or_onoffstate_are_left_out(self):
+        self._log(100, timedelta(hours=1), True)
+        self.assertEqual(list(self._read([100, 101, 555, 999])), [100])
+
+    def test_more_tables_than_one_compound_select_allows(self):
+        conn = sqlite3.connect(self.db_path)
+        device_ids = list(range(1000, 1600))
+        on_ts = (self.now - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+        for dev_id in device_ids:
+            conn.execute(f"CREATE TABLE device_history_{dev_id} (id INTEGER PRIMARY KEY, ts TIMESTAMP, onoffstate BOOL)")
+            conn.execute(f"INSERT INTO device_history_{dev_id} (ts, onoffstate) VALUES (?, ?)", (on_ts, dev_id % 2))
+        conn.commit()
+        conn.close()
+        history = self._read(device_ids)
+        self.assertEqual(sorted(history), device_ids)
+        self.assertEqual(history[1599], (self._ts(timedelta(hours=1)), [(self._ts(timedelta(hours=1)), True)]))
+
+    def test_no_matching_tables(self):
+        self.assertEqual(self._read([999]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()